@@ -0,0 +1,187 @@
+# Pipeline des assets: HTML et CSS minifies, feuille de style nommee par son empreinte, copies precompressees
+import gzip
+import hashlib
+import os
+import re
+from pathlib import Path
+from config import OUTPUT_DIR, STYLESHEET_PATH, PRECOMPRESS, DETAIL_DIR, SPOT_DIR
+
+# Brotli (requirements.txt): si le module manque, seules les copies .gz sont ecrites
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Fichiers publies accompagnes d'une copie precompressee (fragments de detail
+# et pages de spot compris)
+COMPRESSED_PATTERNS = ('*.html', '*.css', '*.json', f'{DETAIL_DIR}/*/*.json', f'{SPOT_DIR}/*.html')
+
+# Fichiers publies laisses tels quels (rapport de run)
+UNCOMPRESSED_FILES = {'metrics.json'}
+
+# En dessous de cette taille, la copie compressee n'est pas plus petite (en-tetes)
+MIN_COMPRESS_BYTES = 256
+
+# Elements dont le contenu est conserve a l'identique par minify_html
+_RAW_ELEMENT = re.compile(r'(<(script|style|pre|textarea)\b.*?</\2\s*>)', re.S | re.I)
+
+# Balises Jinja2, non modifiees par minify_html
+_JINJA_TAG = re.compile(r'({%.*?%}|{{.*?}}|{#.*?#})', re.S)
+
+_COMMENT_HTML = re.compile(r'<!--(?!\[if).*?-->', re.S)
+_COMMENT_CSS = re.compile(r'/\*.*?\*/', re.S)
+_CSS_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_WHITESPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};:,>])\s*')
+
+
+def _collapse(match) -> str:
+    # Une suite de blancs s'affiche comme un seul espace (hors <pre>): un
+    # saut de ligne est garde s'il y en avait un, pour la lisibilite du source
+    return '\n' if '\n' in match.group() else ' '
+
+
+def minify_html(source: str) -> str:
+    """
+    Reduit les blancs d'un template HTML (Jinja2) sans changer son rendu.
+
+    Chaque suite de blancs est ramenee a un seul caractere et les
+    commentaires HTML sont retires; le contenu des <script>, <style>, <pre>
+    et <textarea> et les balises Jinja2 sont conserves a l'identique.
+    Applique au source du template (cf. renderer.MinifyExtension), le cout
+    est paye une fois a la compilation et non a chaque rendu.
+
+    Args:
+        source: Source HTML ou template Jinja2
+
+    Returns:
+        Source minifie
+    """
+    parts = []
+    for i, chunk in enumerate(_RAW_ELEMENT.split(source)):
+        # split: [texte, element brut, nom de l'element, texte, ...]
+        if i % 3 == 1:
+            parts.append(chunk)
+        elif i % 3 == 0:
+            for j, piece in enumerate(_JINJA_TAG.split(chunk)):
+                parts.append(piece if j % 2 else _WHITESPACE.sub(_collapse, _COMMENT_HTML.sub('', piece)))
+    return ''.join(parts)
+
+
+def minify_css(source: str) -> str:
+    """
+    Minifie une feuille de style: commentaires, blancs et derniers ';' retires.
+
+    Les chaines entre guillemets (ex: url("data:...")) sont conservees a l'identique.
+
+    Args:
+        source: Source CSS
+
+    Returns:
+        CSS minifie
+    """
+    parts = []
+    for i, piece in enumerate(_CSS_STRING.split(source)):
+        if i % 2:
+            parts.append(piece)
+        else:
+            css = _WHITESPACE.sub(' ', _COMMENT_CSS.sub('', piece))
+            parts.append(_CSS_PUNCTUATION.sub(r'\1', css).replace(';}', '}'))
+    return ''.join(parts).strip()
+
+
+def _stylesheet(source: str) -> tuple:
+    css = minify_css(Path(source).read_text(encoding='utf-8'))
+    digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:10]
+    return f"{Path(source).stem}.{digest}.css", css
+
+
+def stylesheet_name(source: str = STYLESHEET_PATH) -> str:
+    """Nom publie de la feuille de style (ex: styles.3f2a9c41d0.css), derive de son contenu minifie."""
+    return _stylesheet(source)[0]
+
+
+def publish_stylesheet(output_dir: str = OUTPUT_DIR, source: str = STYLESHEET_PATH) -> str:
+    """
+    Ecrit la feuille de style minifiee sous un nom derive de son contenu.
+
+    Le nom change avec le contenu: les navigateurs peuvent garder le
+    fichier en cache indefiniment, et une page qui reference une ancienne
+    version la trouve toujours.
+
+    Args:
+        output_dir: Dossier de sortie
+        source: Feuille de style source
+
+    Returns:
+        Nom du fichier publie (a referencer dans les pages)
+    """
+    name, css = _stylesheet(source)
+    path = Path(output_dir) / name
+    if not path.exists():
+        tmp_path = path.with_name(f"{name}.tmp")
+        tmp_path.write_text(css, encoding='utf-8')
+        os.replace(tmp_path, path)
+    return name
+
+
+def prune_stylesheets(keep: set, output_dir: str = OUTPUT_DIR, source: str = STYLESHEET_PATH) -> list:
+    """
+    Supprime les feuilles de style publiees qu'aucune page ne reference plus.
+
+    Args:
+        keep: Noms des feuilles de style encore referencees
+        output_dir: Dossier de sortie
+        source: Feuille de style source (prefixe des noms publies)
+
+    Returns:
+        Chemins supprimes (copies precompressees comprises)
+    """
+    removed = []
+    for path in Path(output_dir).glob(f"{Path(source).stem}.*.css*"):
+        if path.name.split('.css')[0] + '.css' not in keep:
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+def precompress(output_dir: str = OUTPUT_DIR) -> list:
+    """
+    Ecrit les copies .gz et .br des fichiers publies.
+
+    Les copies .br demandent le module brotli (ou brotlicffi), installe par
+    requirements.txt: sans lui, seules les copies .gz sont ecrites.
+
+    Seuls les fichiers sans copie ou modifies depuis sont compresses: une
+    page conservee par le mode incremental garde ses copies existantes.
+    Les copies gzip sont deterministes (sans horodatage).
+
+    Args:
+        output_dir: Dossier de sortie
+
+    Returns:
+        Chemins des copies ecrites
+    """
+    if not PRECOMPRESS:
+        return []
+    written = []
+    for pattern in COMPRESSED_PATTERNS:
+        for path in Path(output_dir).glob(pattern):
+            if path.name in UNCOMPRESSED_FILES or path.stat().st_size < MIN_COMPRESS_BYTES:
+                continue
+            data = None
+            encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+            for suffix, encode in encoders:
+                target = path.with_name(path.name + suffix)
+                if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                    continue
+                if data is None:
+                    data = path.read_bytes()
+                target.write_bytes(encode(data))
+                written.append(target)
+    return written
@@ -0,0 +1,189 @@
+# Test de charge de bout en bout: main.main() contre le serveur de substitution (benchmarks/standin.py)
+# Usage (depuis la racine du depot):
+#   python -m benchmarks.load_test [--spots 2000] [--per-region 50] [--runs 2]
+#          [--latency lognormal:0.2,0.6] [--error-rate 0.02] [--change-rate 0.2] [--output FICHIER]
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import urllib.request
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+import sys
+sys.path.append('.')
+from benchmarks.standin import add_server_arguments, make_server, state_from_args, STATS_PATH
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Le scraper, ses limites et le rendu lisent config a l'import: main et
+# webscrapping ne sont importes qu'une fois PYSURF_BASE_URL et la
+# configuration de test en place (cf. configure).
+
+
+def _serve(args, conn) -> None:
+    """Processus serveur: communique son port au harnais puis sert jusqu'a son arret."""
+    server = make_server(state_from_args(args), '127.0.0.1', 0)
+    conn.send(server.server_address[1])
+    conn.close()
+    server.serve_forever()
+
+
+def start_server(args) -> tuple:
+    """
+    Demarre le serveur de substitution dans un processus separe (pas de
+    partage du GIL avec le pipeline mesure).
+
+    Returns:
+        Tuple (processus, url de base)
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_serve, args=(args, child), daemon=True)
+    process.start()
+    port = parent.recv()
+    return process, f"http://127.0.0.1:{port}"
+
+
+def server_stats(base_url: str) -> dict:
+    with urllib.request.urlopen(base_url + STATS_PATH, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def synthetic_regions(n_spots: int, per_region: int) -> dict:
+    """Regions de test: spots enregistres d'abord, puis synthetiques, par groupes de per_region."""
+    fixtures = sorted(path.stem for path in (REPO_DIR / 'benchmarks' / 'fixtures').glob('*.html'))
+    spots = (fixtures + [f"Spot-{i:05d}" for i in range(n_spots)])[:n_spots]
+    return {
+        f"zone-{i // per_region:04d}": {
+            'name': f"Zone {i // per_region}",
+            'slug': f"zone-{i // per_region:04d}",
+            'spots': spots[i:i + per_region],
+        }
+        for i in range(0, len(spots), per_region)
+    }
+
+
+def configure(base_url: str, regions: dict, args) -> None:
+    """Pointe le scraper vers le serveur et installe la configuration de test (avant import de main)."""
+    os.environ['PYSURF_BASE_URL'] = base_url
+    import config
+    config.SURF_FORECAST_ROOT = base_url
+    config.SURF_FORECAST_BASE_URL = base_url + '/breaks/{spot}/forecasts/latest/six_day'
+    config.REGIONS = regions
+    config.REGION_ORDER = list(regions)
+    config.DEFAULT_REGION = config.REGION_ORDER[0]
+    config.MAX_WORKERS = args.workers
+    config.REQUESTS_PER_SECOND = args.rps or None
+    # Chaque run interroge le serveur (GET conditionnels -> 304 sur les pages inchangees)
+    config.CACHE_TTL = 0
+
+
+def run_report(summary: dict, before: dict, after: dict) -> dict:
+    """Resume d'un run: debit, latences par spot, duree totale et compteurs du serveur."""
+    fetch = summary['fetch']
+    server = {key: after.get(key, 0) - before.get(key, 0) for key in after}
+    return {
+        'total_s': summary['total_s'],
+        'spots': fetch['count'],
+        'throughput_spots_s': round(fetch['count'] / summary['total_s'], 2) if summary['total_s'] else None,
+        'latency_p50_s': fetch['latency_p50_s'],
+        'latency_p99_s': fetch['latency_p99_s'],
+        'latency_max_s': fetch['latency_max_s'],
+        'sources': fetch['sources'],
+        'errors': fetch['errors'],
+        'retries': fetch['retries'],
+        'hedged': fetch['hedged'],
+        'bytes': fetch['bytes'],
+        'server': server,
+    }
+
+
+def run(args) -> dict:
+    """
+    Lance le serveur, puis args.runs generations completes de main.main().
+
+    Le run s'execute dans un dossier temporaire (cache, historique et site
+    de sortie isoles du depot), les templates du depot y etant lies.
+
+    Returns:
+        Dict {meta, runs} serialisable en JSON
+    """
+    process, base_url = start_server(args)
+    workdir = Path(tempfile.mkdtemp(prefix='pysurf-load-'))
+    cwd = os.getcwd()
+    try:
+        (workdir / 'templates').symlink_to(REPO_DIR / 'templates', target_is_directory=True)
+        sys.path.insert(0, str(REPO_DIR))
+        os.chdir(workdir)
+
+        regions = synthetic_regions(args.spots, args.per_region)
+        configure(base_url, regions, args)
+        import main
+        from metrics import run_metrics
+
+        runs = []
+        for i in range(args.runs):
+            before = server_stats(base_url)
+            start = time.perf_counter()
+            with redirect_stdout(io.StringIO()):
+                main.main()
+            wall_s = time.perf_counter() - start
+            report = run_report(run_metrics.summary(), before, server_stats(base_url))
+            report['wall_s'] = round(wall_s, 3)
+            runs.append(report)
+            print(f"run {i + 1}: {report['spots']} spots en {report['wall_s']:.2f} s "
+                  f"({report['throughput_spots_s']} spots/s), latence p50 "
+                  f"{report['latency_p50_s']} s / p99 {report['latency_p99_s']} s, "
+                  f"sources {report['sources']}, erreurs {report['errors']}, "
+                  f"retries {report['retries']}, secours {report['hedged']}")
+    finally:
+        os.chdir(cwd)
+        process.terminate()
+        process.join()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"Dossier de travail conserve: {workdir}")
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'spots': args.spots,
+            'per_region': args.per_region,
+            'workers': args.workers,
+            'rps': args.rps,
+            'server': {key: getattr(args, key) for key in
+                       ('latency', 'error_rate', 'hang_rate', 'hang_s', 'change_rate', 'seed')},
+        },
+        'runs': runs,
+    }
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Test de charge de bout en bout de pySurf")
+    parser.add_argument('--spots', type=int, default=1000, help="Nombre de spots")
+    parser.add_argument('--per-region', type=int, default=50, help="Spots par region")
+    parser.add_argument('--runs', type=int, default=2,
+                        help="Generations successives (la deuxieme exerce les 304)")
+    parser.add_argument('--workers', type=int, default=16, help="Requetes simultanees (MAX_WORKERS)")
+    parser.add_argument('--rps', type=float, default=0,
+                        help="Debit maximal vers le serveur (requetes/s, 0 = illimite)")
+    parser.add_argument('--keep', action='store_true', help="Conserve le dossier de travail")
+    parser.add_argument('--output', help="Fichier JSON de resultats")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nResultats: {output}")
+
+
+if __name__ == '__main__':
+    main_cli()
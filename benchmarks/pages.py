@@ -0,0 +1,87 @@
+# Pages six_day synthetiques, au format du tableau de prevision de surf-forecast.com
+import random
+from datetime import date, timedelta
+
+DIRECTIONS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+              'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+RAW_WIND_STATES = ['off', 'on', 'cross', 'cross-off', 'cross-on', 'glassy']
+DAY_NAMES = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+TIMES = ['matin', 'après-midi', 'soir']
+
+# Volume de balisage autour du tableau (navigation, scripts, cartes...):
+# le parsing d'une vraie page porte surtout sur ce bruit
+FILLER_BLOCKS = 400
+
+
+def _filler(rng: random.Random, blocks: int) -> str:
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f'<div class="block-{i % 7}"><a href="/breaks/spot-{rng.randint(0, 9999)}">'
+            f'<span>Spot {i}</span></a><p data-id="{i}">Lorem ipsum dolor sit amet, '
+            f'consectetur adipiscing elit {rng.random():.6f}</p></div>'
+        )
+    return '\n'.join(parts)
+
+
+def forecast_page(spot: str, start: date = None, n_days: int = 7, first_slots: int = 3,
+                  seed=None, filler_blocks: int = FILLER_BLOCKS) -> bytes:
+    """
+    Construit une page six_day synthetique pour un spot.
+
+    Reproduit les lignes exploitees par load_data_f.parse_forecast: 'days'
+    (une cellule par jour avec colspan), 'time' (sans cellule d'en-tete),
+    'rating', 'swell', 'wind' et 'wind-state', au milieu d'un document
+    volumineux.
+
+    Args:
+        spot: Nom du spot (sert aussi de graine par defaut)
+        start: Premier jour de prevision (defaut: aujourd'hui)
+        n_days: Nombre de jours
+        first_slots: Nombre de creneaux restants le premier jour (1 a 3)
+        seed: Graine du generateur aleatoire (defaut: spot)
+        filler_blocks: Nombre de blocs de balisage avant et apres le tableau
+
+    Returns:
+        Contenu HTML encode en UTF-8
+    """
+    rng = random.Random(spot if seed is None else seed)
+    start = start or date.today()
+    days = [start + timedelta(days=i) for i in range(n_days)]
+    counts = [first_slots] + [len(TIMES)] * (n_days - 1)
+    times = TIMES[len(TIMES) - first_slots:] + TIMES * (n_days - 1)
+    n_cells = len(times)
+
+    def cells(values):
+        return ''.join(f'<td class="forecast-table__cell">{v}</td>' for v in values)
+
+    ratings = [rng.choice(['0', '1', '2', '3', '4', '5', '!']) for _ in range(n_cells)]
+    swells = [rng.choice(['—', f"{rng.randint(1, 40) / 10}{rng.choice(DIRECTIONS)}{rng.randint(5, 18)}"])
+              for _ in range(n_cells)]
+    winds = [f"{rng.randint(0, 45)}{rng.choice(DIRECTIONS)}" for _ in range(n_cells)]
+    states = [rng.choice(RAW_WIND_STATES) for _ in range(n_cells)]
+
+    rows = [
+        '<tr data-row="days"><th class="forecast-table__header">Jour</th>' + ''.join(
+            f'<td colspan="{count}"><div class="day-name">{DAY_NAMES[d.weekday()]}</div>'
+            f'<div class="day-number">{d.day}</div></td>'
+            for count, d in zip(counts, days)
+        ) + '</tr>',
+        '<tr data-row="time">' + cells(times) + '</tr>',
+        '<tr data-row="rating"><th>Note</th>' + cells(ratings) + '</tr>',
+        '<tr data-row="swell"><th>Houle</th>' + cells(swells) + '</tr>',
+        '<tr data-row="wind"><th>Vent</th>' + cells(winds) + '</tr>',
+        '<tr data-row="wind-state"><th>Etat</th>' + cells(states) + '</tr>',
+    ]
+
+    html = (
+        '<!DOCTYPE html><html lang="fr"><head><meta charset="utf-8">'
+        f'<title>{spot} - Previsions surf</title></head><body>\n'
+        + _filler(rng, filler_blocks)
+        + '\n<table class="forecast-table__basic"><tbody>\n'
+        + '\n'.join(rows)
+        + '\n</tbody></table>\n'
+        + _filler(rng, filler_blocks)
+        + '\n</body></html>\n'
+    )
+    return html.encode('utf-8')
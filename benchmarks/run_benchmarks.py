@@ -0,0 +1,302 @@
+# Suite de benchmarks hors ligne du pipeline: scraping (HTTP simule), agregation, rendu
+# Usage (depuis la racine du depot):
+#   python -m benchmarks.run_benchmarks [--scales 100 1000 10000] [--repeat 3] [--output FICHIER]
+#   python -m benchmarks.run_benchmarks --compare ancien.json nouveau.json
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('.')
+from benchmarks.synthetic import synthetic_forecast
+from config import SURF_FORECAST_BASE_URL, REGION_ORDER, REGIONS, SUMMARY_MAX_SPOTS, NATIONAL_TOP_N
+from webscrapping import load_data_f as scraper
+from webscrapping import load_data_all as aggregator
+from webscrapping.cache import ForecastCache
+from webscrapping.rate_limit import HostRateLimiter
+from webscrapping.scheduler import RefreshScheduler
+from snapshot import read_snapshot, write_snapshot
+import main
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+RESULTS_DIR = Path(__file__).parent / 'results'
+DEFAULT_SCALES = [100, 1000, 10000]
+
+# Au-dela de cette duree, une mesure n'est pas repetee (grandes echelles)
+MAX_REPEAT_SECONDS = 5.0
+
+
+def load_fixtures() -> dict:
+    """Pages six_day enregistrees ({spot: contenu HTML})."""
+    return {path.stem: path.read_bytes() for path in sorted(FIXTURES_DIR.glob('*.html'))}
+
+
+class _FixtureResponse:
+    def __init__(self, content: bytes):
+        self.content = content
+        self.status_code = 200
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+
+class _FixtureSession:
+    """Session HTTP simulee: sert une page enregistree par URL de spot."""
+
+    def __init__(self, pages_by_url: dict):
+        self.pages_by_url = pages_by_url
+
+    def get(self, url, timeout=None, headers=None):
+        return _FixtureResponse(self.pages_by_url[url])
+
+
+@contextmanager
+def stub_http(spot_pages: dict):
+    """
+    Remplace le reseau du scraper par des pages enregistrees.
+
+    Le cache disque et l'etat du planificateur pointent vers un dossier
+    temporaire (sans TTL) et la limitation de debit est desactivee: seul le
+    traitement local est mesure.
+
+    Args:
+        spot_pages: Dict {spot: contenu HTML}
+    """
+    pages_by_url = {SURF_FORECAST_BASE_URL.format(spot=spot): page for spot, page in spot_pages.items()}
+    saved = (scraper.get_session, scraper.forecast_cache, scraper.rate_limiter, aggregator.RefreshScheduler)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        session = _FixtureSession(pages_by_url)
+        scraper.get_session = lambda: session
+        scraper.forecast_cache = ForecastCache(cache_dir, ttl=0, max_bytes=None)
+        scraper.rate_limiter = HostRateLimiter(None)
+        aggregator.RefreshScheduler = lambda cache: RefreshScheduler(cache, Path(cache_dir) / 'scheduler.json')
+        try:
+            yield
+        finally:
+            (scraper.get_session, scraper.forecast_cache, scraper.rate_limiter,
+             aggregator.RefreshScheduler) = saved
+
+
+def spot_names(n_spots: int) -> list:
+    """Noms de spots pour une echelle donnee (spots reels d'abord, puis synthetiques)."""
+    real = [spot for key in REGION_ORDER for spot in REGIONS[key]['spots']]
+    return (real + [f"Spot-{i:05d}" for i in range(max(0, n_spots - len(real)))])[:n_spots]
+
+
+def measure(func, repeat: int) -> dict:
+    """
+    Chronometre une fonction (meilleur temps et mediane).
+
+    Args:
+        func: Fonction sans argument a mesurer
+        repeat: Nombre de mesures (reduit a 1 si la premiere est trop longue)
+
+    Returns:
+        Dict {repeat, best_s, median_s}
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+        if timings[0] > MAX_REPEAT_SECONDS:
+            break
+    return {'repeat': len(timings), 'best_s': min(timings), 'median_s': statistics.median(timings)}
+
+
+def bench_load_data(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """fetch_spots (sequentiel) sur n_spots spots (HTTP simule): requete, parsing, cache, decodage."""
+    pages = list(fixtures.values())
+    spots = spot_names(n_spots)
+    spot_pages = {spot: pages[i % len(pages)] for i, spot in enumerate(spots)}
+    with stub_http(spot_pages):
+        return measure(lambda: aggregator.fetch_spots(spots, max_workers=1).to_frame(), repeat)
+
+
+def bench_load_regions(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """load_regions (pipeline telechargement/parsing/assemblage) sur n_spots spots en regions de 10."""
+    pages = list(fixtures.values())
+    spots = spot_names(n_spots)
+    spot_pages = {spot: pages[i % len(pages)] for i, spot in enumerate(spots)}
+    region_spots = {f"region-{i // 10}": spots[i:i + 10] for i in range(0, len(spots), 10)}
+    with stub_http(spot_pages):
+        return measure(lambda: sum(len(df) for _, df in aggregator.load_regions(region_spots)), repeat)
+
+
+def bench_consolidate(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """consolidate_forecasts: construction du DataFrame, ratings et reconstruction des dates."""
+    parsed = [scraper.parse_cells(page, spot) for spot, page in fixtures.items()]
+    cells = {spot: dict(parsed[i % len(parsed)], spot=spot) for i, spot in enumerate(spot_names(n_spots))}
+    buffer = aggregator.region_buffer(list(cells), cells)
+    return measure(lambda: aggregator.consolidate_forecasts(buffer), repeat)
+
+
+def bench_date_sequence(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """build_date_sequence seul, sur la sequence entrelacee de n_spots spots."""
+    frame = synthetic_forecast(n_spots).sort_values('time_rank', kind='stable')
+    day_numbers = frame['day'].str.extract(r'(\d+)$')[0].astype(int).tolist()
+    return measure(lambda: aggregator.build_date_sequence(day_numbers), repeat)
+
+
+def bench_build_dates(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """extract_day_numbers + build_dates (moteur de dates vectorise) sur n_spots spots."""
+    frame = synthetic_forecast(n_spots).sort_values('time_rank', kind='stable')
+    return measure(lambda: aggregator.build_dates(frame['spot'], aggregator.extract_day_numbers(frame['day'])),
+                   repeat)
+
+
+def bench_build_slots(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """main.build_slots sur n_spots spots x 21 creneaux."""
+    frame = synthetic_forecast(n_spots)
+    return measure(lambda: main.build_slots(frame), repeat)
+
+
+def bench_generate_html(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """main.generate_html (rendu Jinja2 complet) pour n_spots spots."""
+    slots = main.build_slots(synthetic_forecast(n_spots))
+    best_session = main.find_best_session(slots)
+    region_key = REGION_ORDER[0]
+    return measure(lambda: main.generate_html(slots, best_session, region_key, REGIONS), repeat)
+
+
+def bench_detail_shards(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """main.detail_shards (fragments JSON du detail, un par jour) pour n_spots spots."""
+    slots = main.build_slots(synthetic_forecast(n_spots), SUMMARY_MAX_SPOTS)
+    return measure(lambda: main.detail_shards(slots, REGIONS[REGION_ORDER[0]]['slug']), repeat)
+
+
+def bench_national(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """main.national_frame + build_slots(top_n): page nationale sur n_spots spots repartis entre les regions."""
+    frame = synthetic_forecast(n_spots)
+    codes = frame['spot'].astype('category').cat.codes.to_numpy()
+    frames = {key: frame[codes % len(REGION_ORDER) == i] for i, key in enumerate(REGION_ORDER)}
+    return measure(lambda: main.build_slots(main.national_frame(frames), SUMMARY_MAX_SPOTS, NATIONAL_TOP_N),
+                   repeat)
+
+
+def bench_spot_pages(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """main.write_spot_pages (index par spot + rendu de n_spots pages) dans un dossier temporaire."""
+    frame = synthetic_forecast(n_spots)
+    with tempfile.TemporaryDirectory() as output_dir:
+        return measure(lambda: main.write_spot_pages(REGION_ORDER[0], REGIONS, frame, '-', output_dir,
+                                                     'styles.css'), repeat)
+
+
+def bench_snapshot(n_spots: int, fixtures: dict, repeat: int) -> dict:
+    """snapshot.read_snapshot (mmap) d'un instantane de n_spots spots, ecrit dans un dossier temporaire."""
+    frame = synthetic_forecast(n_spots)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_snapshot({REGION_ORDER[0]: frame}, datetime.now(), Path(tmp_dir) / 'snapshot.bin')
+        return measure(lambda: read_snapshot(path), repeat)
+
+
+STAGES = {
+    'load_data': bench_load_data,
+    'load_regions': bench_load_regions,
+    'consolidate': bench_consolidate,
+    'date_sequence': bench_date_sequence,
+    'build_dates': bench_build_dates,
+    'build_slots': bench_build_slots,
+    'generate_html': bench_generate_html,
+    'detail_shards': bench_detail_shards,
+    'national': bench_national,
+    'spot_pages': bench_spot_pages,
+    'snapshot': bench_snapshot,
+}
+
+
+def git_commit() -> str:
+    """Commit courant (ou 'unknown' hors depot git)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(scales: list, stages: list, repeat: int) -> dict:
+    """
+    Execute les benchmarks demandes.
+
+    Args:
+        scales: Nombres de spots a tester
+        stages: Noms des etapes (cles de STAGES)
+        repeat: Nombre de mesures par cas
+
+    Returns:
+        Dict {meta, results} serialisable en JSON
+    """
+    fixtures = load_fixtures()
+    results = []
+    for stage in stages:
+        for n_spots in scales:
+            print(f"{stage:>14} {n_spots:>7} spots ...", end=' ', flush=True)
+            result = STAGES[stage](n_spots, fixtures, repeat)
+            results.append({'stage': stage, 'spots': n_spots, **result})
+            print(f"{result['best_s']:.4f} s")
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'fixtures': sorted(fixtures),
+        },
+        'results': results,
+    }
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Affiche les ecarts de temps entre deux fichiers de resultats."""
+    old = json.loads(Path(old_path).read_text(encoding='utf-8'))
+    new = json.loads(Path(new_path).read_text(encoding='utf-8'))
+    old_results = {(r['stage'], r['spots']): r for r in old['results']}
+
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    print(f"{'etape':>14} {'spots':>7} {'avant (s)':>10} {'apres (s)':>10} {'ratio':>7}")
+    for result in new['results']:
+        before = old_results.get((result['stage'], result['spots']))
+        if before is None:
+            continue
+        ratio = before['best_s'] / result['best_s'] if result['best_s'] else float('inf')
+        print(f"{result['stage']:>14} {result['spots']:>7} {before['best_s']:>10.4f} "
+              f"{result['best_s']:>10.4f} {ratio:>6.2f}x")
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne du pipeline pySurf")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="Nombres de spots a tester")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help="Etapes a mesurer")
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de mesures par cas")
+    parser.add_argument('--output', help="Fichier JSON de resultats (defaut: benchmarks/results/)")
+    parser.add_argument('--compare', nargs=2, metavar=('ANCIEN', 'NOUVEAU'),
+                        help="Compare deux fichiers de resultats")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = run(args.scales, args.stages, args.repeat)
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}_{report['meta']['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\nResultats: {output}")
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,262 @@
+# Serveur local de substitution a surf-forecast.com (tests de charge de bout en bout)
+# Usage (depuis la racine du depot):
+#   python -m benchmarks.standin [--port 8765] [--latency lognormal:0.2,0.5] [--error-rate 0.02]
+#   PYSURF_BASE_URL=http://127.0.0.1:8765 python main.py
+import argparse
+import gzip
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import sys
+sys.path.append('.')
+from benchmarks.pages import forecast_page
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+# Chemin des pages six_day (forme de SURF_FORECAST_BASE_URL)
+PAGE_PATH = re.compile(r'^/breaks/([^/]+)/forecasts/latest/six_day/?$')
+
+# Compteurs du serveur (GET: JSON)
+STATS_PATH = '/__stats'
+
+# Pages (brutes et compressees) gardees en memoire
+PAGE_CACHE_SIZE = 4096
+
+# Statuts renvoyes pour une erreur injectee
+ERROR_STATUSES = (500, 502, 503, 429)
+
+
+def parse_latency(spec: str):
+    """
+    Distribution de latence a partir d'une description textuelle.
+
+    Formes acceptees (secondes):
+        none                    aucune latence
+        fixed:0.2               latence constante
+        uniform:0.05,0.5        uniforme entre deux bornes
+        lognormal:0.2,0.6       log-normale de mediane 0.2 et d'ecart-type (log) 0.6:
+                                la forme des latences reelles, avec une queue lente
+
+    Args:
+        spec: Description de la distribution
+
+    Returns:
+        Fonction sample(rng) -> latence en secondes
+
+    Raises:
+        ValueError: Description invalide
+    """
+    kind, _, params = (spec or 'none').partition(':')
+    values = [float(v) for v in params.split(',') if v]
+    if kind == 'none':
+        return lambda rng: 0.0
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == 'lognormal' and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * math.exp(sigma * rng.gauss(0, 1))
+    raise ValueError(f"Distribution de latence invalide: {spec!r}")
+
+
+class StandinState:
+    """
+    Etat partage par les threads du serveur: pages, versions, aleas et compteurs.
+
+    Chaque spot a une version courante; a chaque requete, la page change
+    (nouvelle version, nouvel ETag) avec la probabilite change_rate. Un
+    GET conditionnel sur la version courante recoit un 304.
+    """
+
+    def __init__(self, latency: str = 'none', error_rate: float = 0.0, hang_rate: float = 0.0,
+                 hang_s: float = 30.0, change_rate: float = 0.0, conditional: bool = True,
+                 recorded: bool = True, filler_blocks: int = None, seed: int = 0):
+        """
+        Args:
+            latency: Distribution de latence par requete (cf. parse_latency)
+            error_rate: Proportion de reponses en erreur (5xx / 429)
+            hang_rate: Proportion de requetes bloquees hang_s secondes (timeouts clients)
+            hang_s: Duree d'une requete bloquee
+            change_rate: Probabilite qu'une page change entre deux requetes
+            conditional: Repond 304 aux GET conditionnels sur une page inchangee
+            recorded: Sert les pages enregistrees (benchmarks/fixtures) pour leurs spots
+            filler_blocks: Taille du balisage des pages synthetiques (defaut: pages.FILLER_BLOCKS)
+            seed: Graine des aleas (latence, erreurs, changements)
+        """
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.change_rate = change_rate
+        self.conditional = conditional
+        self.filler_blocks = filler_blocks
+        self.recorded = {path.stem: path.read_bytes() for path in FIXTURES_DIR.glob('*.html')} if recorded else {}
+        self.rng = random.Random(seed)
+        self.versions = {}
+        self.stats = Counter()
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def draw(self, spot: str) -> dict:
+        """Tire les aleas d'une requete (latence, erreur, blocage, changement de page)."""
+        with self._lock:
+            version = self.versions.setdefault(spot, 0)
+            if self.change_rate and self.rng.random() < self.change_rate:
+                version = self.versions[spot] = version + 1
+            return {
+                'version': version,
+                'latency': max(0.0, self.sample_latency(self.rng)),
+                'error': self.rng.choice(ERROR_STATUSES) if self.rng.random() < self.error_rate else None,
+                'hang': self.rng.random() < self.hang_rate,
+            }
+
+    def page(self, spot: str, version: int, compressed: bool) -> bytes:
+        """Page six_day d'un spot a une version donnee (brute ou gzip)."""
+        key = (spot, version, compressed)
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+        if version == 0 and spot in self.recorded:
+            content = self.recorded[spot]
+        else:
+            options = {} if self.filler_blocks is None else {'filler_blocks': self.filler_blocks}
+            content = forecast_page(spot, seed=f"{spot}-{version}", **options)
+        if compressed:
+            content = gzip.compress(content, compresslevel=5)
+        with self._lock:
+            self._pages[key] = content
+            while len(self._pages) > PAGE_CACHE_SIZE:
+                self._pages.popitem(last=False)
+        return content
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Sert les pages six_day selon l'etat du serveur (self.server.state)."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'', headers: dict = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.server.state
+        if self.path == STATS_PATH:
+            body = json.dumps(state.snapshot()).encode('utf-8')
+            self._send(200, body, {'Content-Type': 'application/json'})
+            return
+
+        match = PAGE_PATH.match(self.path.split('?')[0])
+        if not match:
+            state.count('404')
+            self._send(404)
+            return
+
+        spot = match.group(1)
+        state.count('requests')
+        draw = state.draw(spot)
+        time.sleep(state.hang_s if draw['hang'] else draw['latency'])
+        if draw['error']:
+            state.count(str(draw['error']))
+            self._send(draw['error'], headers={'Retry-After': '1'} if draw['error'] == 429 else None)
+            return
+
+        etag = f'"{spot}-{draw["version"]}"'
+        if state.conditional and self.headers.get('If-None-Match') == etag:
+            state.count('304')
+            self._send(304, headers={'ETag': etag})
+            return
+
+        compressed = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag}
+        if compressed:
+            headers['Content-Encoding'] = 'gzip'
+        state.count('200')
+        self._send(200, state.page(spot, draw['version'], compressed), headers)
+
+
+def make_server(state: StandinState, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+    """
+    Cree le serveur de substitution (un thread par connexion).
+
+    Args:
+        state: Etat du serveur (pages, aleas, compteurs)
+        host: Adresse d'ecoute
+        port: Port d'ecoute (0 = port libre choisi par le systeme)
+
+    Returns:
+        Serveur pret a servir (server.server_address donne le port effectif)
+    """
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options du serveur, partagees avec le harnais de charge (cf. load_test.py)."""
+    parser.add_argument('--latency', default='none',
+                        help="Distribution de latence: none, fixed:S, uniform:A,B, lognormal:MEDIANE,SIGMA")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Proportion de reponses 5xx/429")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="Proportion de requetes bloquees")
+    parser.add_argument('--hang-s', type=float, default=30.0, help="Duree d'une requete bloquee (s)")
+    parser.add_argument('--change-rate', type=float, default=0.0,
+                        help="Probabilite qu'une page change entre deux requetes")
+    parser.add_argument('--no-conditional', action='store_true', help="Jamais de reponse 304")
+    parser.add_argument('--synthetic-only', action='store_true',
+                        help="Pages synthetiques meme pour les spots enregistres")
+    parser.add_argument('--seed', type=int, default=0, help="Graine des aleas")
+
+
+def state_from_args(args) -> StandinState:
+    return StandinState(
+        latency=args.latency, error_rate=args.error_rate, hang_rate=args.hang_rate,
+        hang_s=args.hang_s, change_rate=args.change_rate, conditional=not args.no_conditional,
+        recorded=not args.synthetic_only, seed=args.seed,
+    )
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serveur local de substitution a surf-forecast.com")
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse d'ecoute")
+    parser.add_argument('--port', type=int, default=8765, help="Port d'ecoute")
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = make_server(state_from_args(args), args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serveur de substitution: http://{host}:{port} (PYSURF_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -0,0 +1,60 @@
+# Generation de previsions synthetiques pour les benchmarks (aucun acces reseau)
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('..')
+from config import TIME_MAPPING
+from webscrapping.schema import apply_schema
+
+DIRECTIONS = ['N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+              'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+WIND_STATES = ['Offshore', 'Onshore', 'Cross', 'Cross-off', 'Cross-on', 'Glass']
+DAY_NAMES = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+
+def synthetic_forecast(n_spots: int, n_days: int = 7, start: date = None,
+                       seed: int = 0) -> pd.DataFrame:
+    """
+    Construit un DataFrame au format de sortie de load_data_all (schema compact).
+
+    Args:
+        n_spots: Nombre de spots
+        n_days: Nombre de jours de prevision (3 creneaux par jour)
+        start: Premier jour de prevision (defaut: aujourd'hui)
+        seed: Graine du generateur aleatoire
+
+    Returns:
+        DataFrame avec colonnes spot, day, time, rating, wave_height, wave_dir,
+        period, wind_speed, wind_dir, wind_state, hour, time_rank, date, key, date_time
+    """
+    rng = np.random.default_rng(seed)
+    start = start or date.today()
+    times = list(TIME_MAPPING)
+    n_slots = n_days * len(times)
+    n_rows = n_spots * n_slots
+
+    slot = np.tile(np.arange(n_slots), n_spots)
+    day_offset = slot // len(times)
+    days = [start + timedelta(days=i) for i in range(n_days)]
+    day_labels = np.array([f"{DAY_NAMES[d.weekday()]}{d.day}" for d in days])
+    hours = np.array([TIME_MAPPING[t] for t in times])
+
+    frame = pd.DataFrame({
+        'spot': np.repeat([f"Spot-{i:05d}" for i in range(n_spots)], n_slots),
+        'day': day_labels[day_offset],
+        'time': np.array(times)[slot % len(times)],
+        'rating': rng.integers(-1, 6, n_rows),
+        'wave_height': np.round(rng.uniform(0, 4, n_rows), 1),
+        'wave_dir': rng.choice(DIRECTIONS, n_rows),
+        'period': rng.integers(0, 17, n_rows),
+        'wind_speed': rng.integers(0, 40, n_rows),
+        'wind_dir': rng.choice(DIRECTIONS, n_rows),
+        'wind_state': rng.choice(WIND_STATES, n_rows),
+    })
+    frame['hour'] = hours[slot % len(times)]
+    frame['time_rank'] = slot
+    frame['date'] = pd.to_datetime(np.array(days, dtype='datetime64[D]')[day_offset])
+    frame['key'] = frame['date'] + pd.to_timedelta(frame['hour'], unit='h')
+    frame['date_time'] = frame['date'].dt.strftime('%Y-%m-%d') + '_' + frame['time']
+    return apply_schema(frame).sort_values('key', kind='stable').reset_index(drop=True)
@@ -1,4 +1,5 @@
 # Configuration centralisee pour pySurf
+import os
 
 # Definition des regions avec leurs spots de surf
 # Chaque region contient: nom d'affichage, slug URL, liste des spots
@@ -73,6 +74,13 @@ DEFAULT_REGION = 'vendee'
 # Liste de toutes les regions pour l'iteration
 REGION_ORDER = ['finistere', 'vendee', 'charente', 'gironde']
 
+# Page nationale (national.html): pour chaque creneau, les NATIONAL_TOP_N
+# meilleurs spots de toutes les regions, avec leur region (cf. main.national_frame)
+NATIONAL_PAGE = True
+NATIONAL_KEY = 'national'
+NATIONAL_REGION = {'name': 'France', 'slug': 'national'}
+NATIONAL_TOP_N = 10
+
 # Mapping des periodes de la journee vers des heures numeriques
 TIME_MAPPING = {
     'matin': 9,
@@ -91,14 +99,141 @@ WIND_QUALITY = {
     'Onshore': 'wind-bad',
 }
 
-# URL de base pour surf-forecast.com
-SURF_FORECAST_BASE_URL = 'https://fr.surf-forecast.com/breaks/{spot}/forecasts/latest/six_day'
+# URL de base pour surf-forecast.com (PYSURF_BASE_URL pointe le scraper vers un
+# autre serveur, ex: le serveur de substitution de benchmarks/standin.py)
+SURF_FORECAST_ROOT = os.environ.get('PYSURF_BASE_URL', 'https://fr.surf-forecast.com').rstrip('/')
+SURF_FORECAST_BASE_URL = SURF_FORECAST_ROOT + '/breaks/{spot}/forecasts/latest/six_day'
 
 # Timeout pour les requetes HTTP (en secondes)
 REQUEST_TIMEOUT = 10
 
+# Nombre maximal de spots recuperes en parallele (1 = mode sequentiel)
+MAX_WORKERS = 8
+
+# Pipeline de chargement (cf. webscrapping/pipeline.py): processus de parsing
+# (0 = parsing dans un thread du processus principal, adapte a une machine a un
+# seul coeur) et capacite des files entre les etages telechargement/parsing/assemblage
+PARSE_WORKERS = int(os.environ.get('PYSURF_PARSE_WORKERS', max(0, min(4, (os.cpu_count() or 1) - 1))))
+PIPELINE_QUEUE_SIZE = 16
+
+# Politique de requetes (cf. webscrapping/fetch_policy.py):
+# duree maximale de la phase reseau d'un run (secondes, None = illimitee);
+# le timeout de chaque requete est borne par le temps restant
+RUN_DEADLINE = 120
+
+# Timeout minimal d'une requete: en dessous, le spot sert sa derniere prevision en cache
+MIN_REQUEST_TIMEOUT = 1.0
+
+# Nouvelles tentatives apres une erreur reseau, un timeout ou une reponse 5xx/429,
+# espacees d'un delai exponentiel aleatoire (base x 2^tentative, plafonne)
+FETCH_RETRIES = 2
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8.0
+
+# Requete de secours: si une requete depasse ce percentile des latences observees
+# du run, une seconde est envoyee et la premiere reponse est retenue (None = desactive)
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 10
+
+# Coupe-circuit par hote: au-dela de ce taux d'erreurs sur les BREAKER_WINDOW
+# dernieres requetes, plus aucune requete pendant BREAKER_COOLDOWN secondes
+BREAKER_ERROR_RATE = 0.5
+BREAKER_WINDOW = 20
+BREAKER_COOLDOWN = 30.0
+
+# Debit maximal de requetes par hote (requetes/seconde), pour rester poli
+# envers surf-forecast.com. 0 ou None desactive la limitation.
+REQUESTS_PER_SECOND = 4
+
+# GET conditionnel (ETag / Last-Modified): une page inchangee depuis le run
+# precedent (reponse 304) n'est ni retelechargee ni reparsee.
+CONDITIONAL_GET = True
+
+# Cache disque des previsions (HTML brut + prevision parsee, cf. webscrapping/cache.py)
+CACHE_DIR = '.cache/forecasts'
+
+# Duree (secondes) pendant laquelle un spot recupere n'est pas re-telecharge
+# (0 = toujours interroger le site)
+CACHE_TTL = 45 * 60
+
+# Taille maximale du cache avant eviction des objets les plus anciens (octets)
+CACHE_MAX_BYTES = 100 * 1024 * 1024
+
+# Mode du cache:
+#   'online'  : reseau + cache (TTL, repli sur la derniere donnee valide en cas d'echec)
+#   'offline' : rejeu complet depuis le cache, sans aucune requete reseau
+CACHE_MODE = os.environ.get('PYSURF_CACHE_MODE', 'online')
+
+# Parseur du tableau de prevision: 'fast' (tokenizer en flux limite aux lignes
+# data-row, repli automatique sur BeautifulSoup) ou 'bs4' (arbre complet)
+PARSER_BACKEND = 'fast'
+
 # Dossier de sortie pour les fichiers HTML generes
 OUTPUT_DIR = '_site'
 
+# Regeneration incrementale: une region dont les previsions n'ont pas change
+# depuis le run precedent n'est pas re-rendue (cf. incremental.py)
+INCREMENTAL_BUILD = True
+
+# Manifeste des pages generees (empreinte des previsions par region).
+# Place sous .cache/ pour etre conserve entre deux runs de la CI (avec OUTPUT_DIR,
+# cf. .github/workflows/deploy.yaml), hors du site publie.
+MANIFEST_FILE = '.cache/manifest.json'
+
+# Horodatage du dernier run, lu par les pages au chargement, dans OUTPUT_DIR
+LAST_UPDATE_FILE = 'last_update.json'
+
+# Rapport de metriques du run (latences, octets, temps par etape), dans OUTPUT_DIR
+METRICS_FILE = 'metrics.json'
+
+# Affiche aussi une ligne JSON par evenement de metriques
+METRICS_LOG = os.environ.get('PYSURF_METRICS_LOG', '') == '1'
+
 # Chemin du template HTML
 TEMPLATE_PATH = 'templates/index.html'
+
+# Pipeline des assets (cf. assets.py): blancs du HTML reduits a la compilation
+# du template, feuille de style minifiee et publiee sous un nom derive de son
+# contenu (styles.<empreinte>.css), copies .gz et .br (module brotli, cf.
+# requirements.txt) de chaque fichier publie
+MINIFY_HTML = True
+STYLESHEET_PATH = 'templates/styles.css'
+PRECOMPRESS = True
+
+# Detail des creneaux (tous les spots d'un horaire): 'inline' = detail inclus
+# dans la page (consultable sans serveur HTTP, mais poids proportionnel aux
+# spots); 'shards' = fragments JSON colonnaires par region et par jour
+# (OUTPUT_DIR/DETAIL_DIR/<slug>/<jour>.json), charges par la page au depliage
+# d'une ligne (site servi en HTTP, cf. .github/workflows/deploy.yaml)
+DETAIL_MODE = os.environ.get('PYSURF_DETAIL_MODE', 'inline')
+DETAIL_DIR = 'data'
+
+# Page de chaque spot (OUTPUT_DIR/SPOT_DIR/<spot>.html): ses creneaux de
+# prevision; les liens des spots des pages de region y menent
+SPOT_PAGES = True
+SPOT_DIR = 'spots'
+SPOT_TEMPLATE_PATH = 'templates/spot.html'
+
+# Mode 'shards': meilleurs spots nommes dans une ligne resume (les suivants
+# sont comptes, tous figurent dans le detail)
+SUMMARY_MAX_SPOTS = 5
+
+# Cache disque du bytecode des templates Jinja2 (None = pas de cache)
+TEMPLATE_CACHE_DIR = '.cache/jinja'
+
+# Historique des previsions de chaque run (SQLite, cf. history.py); '' = desactive.
+# Place sous .cache/ pour etre conserve entre deux runs de la CI.
+HISTORY_DB = os.environ.get('PYSURF_HISTORY_DB', '.cache/history.sqlite')
+
+# Nombre maximal de spots re-telecharges par run (None = tous): les autres
+# reutilisent leur derniere prevision en cache (cf. webscrapping/scheduler.py)
+REFRESH_BUDGET = int(os.environ['PYSURF_REFRESH_BUDGET']) if os.environ.get('PYSURF_REFRESH_BUDGET') else None
+
+# Etat du planificateur (date du dernier telechargement, frequence de
+# changement et notes recentes de chaque spot)
+SCHEDULER_STATE = '.cache/scheduler.json'
+
+# Instantane des previsions consolidees de chaque region, ecrit par la phase
+# de scraping et relu par la phase de rendu (cf. snapshot.py, main.py render):
+# format binaire colonnaire, relu par mmap sans copie
+SNAPSHOT_FILE = os.environ.get('PYSURF_SNAPSHOT', '.cache/snapshot.bin')
@@ -0,0 +1,196 @@
+# Historique des previsions: chaque run ajoute ses previsions consolidees a une base SQLite
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import HISTORY_DB
+from webscrapping.schema import heights_as_float64
+
+# Colonnes conservees pour chaque (spot, creneau, run)
+VALUE_COLUMNS = ['rating', 'wave_height', 'wave_dir', 'period', 'wind_speed', 'wind_dir', 'wind_state']
+
+# Les instants (creneau key, run_time) sont stockes en secondes entieres depuis
+# l'epoch, sur l'heure locale naive des DataFrames (comme 'key' dans load_data_all).
+# La cle primaire (spot, key, run_time) est l'index de la table (WITHOUT ROWID):
+# les lectures par spot ne parcourent que la plage de ce spot, et l'index
+# (key, run_time) sert l'evolution d'un creneau.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    spot TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    run_time INTEGER NOT NULL,
+    rating INTEGER,
+    wave_height REAL,
+    wave_dir TEXT,
+    period INTEGER,
+    wind_speed INTEGER,
+    wind_dir TEXT,
+    wind_state TEXT,
+    PRIMARY KEY (spot, key, run_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS forecasts_key_run ON forecasts (key, run_time);
+CREATE TABLE IF NOT EXISTS runs (
+    run_time INTEGER PRIMARY KEY,
+    rows INTEGER NOT NULL
+);
+"""
+
+# Premier creneau d'un run: au plus tot le matin du jour du run (cf. spot_history)
+MAX_SLOT_LEAD = timedelta(days=1)
+
+
+def _seconds(values) -> np.ndarray:
+    """Instants (datetime, Series ou tableau datetime64) -> secondes entieres depuis l'epoch."""
+    return np.asarray(pd.to_datetime(values), dtype='datetime64[s]').astype('int64')
+
+
+def _timestamps(seconds: pd.Series) -> pd.Series:
+    """Secondes depuis l'epoch -> datetime64 (heure locale naive)."""
+    return pd.to_datetime(seconds, unit='s')
+
+
+def _column_values(frame: pd.DataFrame, col: str) -> list:
+    """Valeurs Python d'une colonne (categories en texte, hauteurs float32 arrondies)."""
+    if col == 'wave_height':
+        return heights_as_float64(frame[col]).tolist()
+    if isinstance(frame[col].dtype, pd.CategoricalDtype) or frame[col].dtype == object:
+        return frame[col].astype(str).tolist()
+    return frame[col].tolist()
+
+
+class HistoryStore:
+    """
+    Base SQLite des previsions de tous les runs.
+
+    Une ligne par (spot, creneau, run): ajouter un run ne coute que ses propres
+    lignes (insertion dans l'index, sans reecriture des runs precedents), et
+    les requetes par spot ou par creneau n'en lisent qu'une plage d'index.
+    """
+
+    def __init__(self, path: str = HISTORY_DB):
+        """
+        Args:
+            path: Fichier SQLite (cree au besoin, dossier parent compris)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append_run(self, forecast_df: pd.DataFrame, run_time: datetime) -> int:
+        """
+        Ajoute les previsions consolidees d'un run (une region a la fois).
+
+        Un spot partage par plusieurs regions n'est enregistre qu'une fois par
+        run (meme cle primaire).
+
+        Args:
+            forecast_df: Previsions consolidees (cf. load_data_all.consolidate_forecasts)
+            run_time: Instant du run
+
+        Returns:
+            Nombre de lignes ajoutees (hors lignes deja presentes pour ce run)
+        """
+        if forecast_df is None or forecast_df.empty:
+            return 0
+        frame = forecast_df[forecast_df['key'].notna()]
+        run_seconds = int(_seconds([run_time])[0])
+        columns = [
+            frame['spot'].astype(str).tolist(),
+            _seconds(frame['key']).tolist(),
+            [run_seconds] * len(frame),
+        ] + [_column_values(frame, col) for col in VALUE_COLUMNS]
+        rows = list(zip(*columns))
+
+        # Lignes du run sur les creneaux du lot (index (key, run_time)): seule
+        # leur difference avant/apres l'insertion compte dans runs.rows, un
+        # run reecrit ou un spot partage remplacant ses lignes existantes
+        keys = sorted(set(columns[1]))
+        count_sql = (f"SELECT COUNT(*) FROM forecasts WHERE run_time = ? "
+                     f"AND key IN ({', '.join('?' * len(keys))})")
+
+        with self._conn:
+            before = self._conn.execute(count_sql, (run_seconds, *keys)).fetchone()[0]
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO forecasts (spot, key, run_time, {', '.join(VALUE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (3 + len(VALUE_COLUMNS)))})",
+                rows,
+            )
+            added = self._conn.execute(count_sql, (run_seconds, *keys)).fetchone()[0] - before
+            self._conn.execute(
+                'INSERT INTO runs (run_time, rows) VALUES (?, ?) '
+                'ON CONFLICT (run_time) DO UPDATE SET rows = rows + excluded.rows',
+                (run_seconds, added),
+            )
+        return added
+
+    def _query(self, sql: str, params: tuple) -> pd.DataFrame:
+        frame = pd.read_sql_query(sql, self._conn, params=params)
+        for col in ('key', 'run_time'):
+            frame[col] = _timestamps(frame[col])
+        return frame
+
+    def spot_history(self, spot: str, days: int = 7, now: datetime = None) -> pd.DataFrame:
+        """
+        Toutes les previsions d'un spot emises par les runs des derniers jours.
+
+        Les creneaux d'un run commencent au plus tot MAX_SLOT_LEAD avant le
+        run: la borne sur key limite la lecture a la fin de la plage du spot
+        dans l'index (spot, key, run_time).
+
+        Args:
+            spot: Nom du spot
+            days: Nombre de jours d'historique
+            now: Instant de reference (defaut: maintenant)
+
+        Returns:
+            DataFrame (spot, key, run_time, rating, wave_height, ...) trie par
+            creneau puis par run
+        """
+        since = (now or datetime.now()) - timedelta(days=days)
+        since_seconds = int(_seconds([since])[0])
+        lead_seconds = int(MAX_SLOT_LEAD.total_seconds())
+        return self._query(
+            'SELECT * FROM forecasts WHERE spot = ? AND key >= ? AND run_time >= ? '
+            'ORDER BY key, run_time',
+            (spot, since_seconds - lead_seconds, since_seconds),
+        )
+
+    def slot_evolution(self, key: datetime, spot: str = None) -> pd.DataFrame:
+        """
+        Evolution de la prevision d'un creneau d'un run a l'autre.
+
+        Args:
+            key: Creneau (date + heure, cf. colonne 'key' de load_data_all)
+            spot: Limite a un spot (defaut: tous les spots)
+
+        Returns:
+            DataFrame (spot, key, run_time, rating, wave_height, ...) trie par
+            spot puis par run
+        """
+        key_seconds = int(_seconds([key])[0])
+        if spot is None:
+            return self._query(
+                'SELECT * FROM forecasts WHERE key = ? ORDER BY spot, run_time', (key_seconds,)
+            )
+        return self._query(
+            'SELECT * FROM forecasts WHERE spot = ? AND key = ? ORDER BY run_time', (spot, key_seconds)
+        )
+
+    def runs(self) -> pd.DataFrame:
+        """Runs enregistres (run_time, rows), du plus ancien au plus recent."""
+        frame = pd.read_sql_query('SELECT run_time, rows FROM runs ORDER BY run_time', self._conn)
+        frame['run_time'] = _timestamps(frame['run_time'])
+        return frame
@@ -0,0 +1,146 @@
+# Regeneration incrementale du site: empreinte des previsions et manifeste des pages
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+from config import (
+    OUTPUT_DIR, MANIFEST_FILE, LAST_UPDATE_FILE, TEMPLATE_PATH, MINIFY_HTML, DETAIL_MODE,
+    NATIONAL_PAGE, NATIONAL_KEY, NATIONAL_REGION, NATIONAL_TOP_N, SPOT_PAGES, SPOT_TEMPLATE_PATH
+)
+
+# Colonnes qui determinent le contenu d'une page (hors horodatage du rendu);
+# 'region' n'existe que dans les previsions de la page nationale
+FINGERPRINT_COLUMNS = ['spot', 'key', 'date', 'time', 'rating', 'wave_height', 'wave_dir',
+                       'period', 'wind_speed', 'wind_dir', 'wind_state', 'region']
+
+
+def forecast_fingerprint(forecast_df: pd.DataFrame, context=None) -> str:
+    """
+    Calcule l'empreinte des previsions normalisees d'une region.
+
+    Les lignes sont triees par (spot, key) pour que l'ordre d'arrivee des
+    spots n'influe pas. Le contexte de rendu (template, liste des regions...)
+    est inclus: le modifier force la regeneration de la page.
+
+    Args:
+        forecast_df: Previsions consolidees de la region (cf. load_data_all)
+        context: Donnees de rendu supplementaires serialisables en JSON
+
+    Returns:
+        Empreinte hexadecimale SHA-256
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(context, sort_keys=True, default=str).encode('utf-8'))
+
+    if forecast_df is not None and not forecast_df.empty:
+        columns = [col for col in FINGERPRINT_COLUMNS if col in forecast_df.columns]
+        normalized = forecast_df[columns].sort_values(['spot', 'key'], kind='stable')
+        digest.update(json.dumps(columns).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(normalized, index=False).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+def render_context(region_key: str, all_regions: dict, region_order: list,
+                   stylesheet: str = None) -> dict:
+    """
+    Contexte de rendu d'une page, hors previsions (cf. forecast_fingerprint).
+
+    Args:
+        region_key: Cle de la region
+        all_regions: Dictionnaire de toutes les regions
+        region_order: Ordre des regions dans le selecteur
+        stylesheet: Feuille de style publiee (son nom change avec son contenu)
+
+    Returns:
+        Dict serialisable: hash des templates (region, spot), feuille de
+        style, minification, mode du detail, taille du classement national
+        et regions du selecteur
+    """
+    template_hash = hashlib.sha256(Path(TEMPLATE_PATH).read_bytes()).hexdigest()
+    spot_template_hash = hashlib.sha256(Path(SPOT_TEMPLATE_PATH).read_bytes()).hexdigest() if SPOT_PAGES else None
+    regions = [(key, all_regions[key]['name'], all_regions[key]['slug']) for key in region_order]
+    if NATIONAL_PAGE:
+        regions.append((NATIONAL_KEY, NATIONAL_REGION['name'], NATIONAL_REGION['slug']))
+    return {
+        'region': region_key,
+        'template': template_hash,
+        'spot_template': spot_template_hash,
+        'stylesheet': stylesheet,
+        'minify': MINIFY_HTML,
+        'detail': DETAIL_MODE,
+        'top_n': NATIONAL_TOP_N if region_key == NATIONAL_KEY else None,
+        'regions': regions,
+    }
+
+
+def load_manifest(path: str = MANIFEST_FILE) -> dict:
+    """
+    Charge le manifeste des pages generees ({region: {fingerprint, file, stylesheet, shards, spots}}).
+
+    Les fichiers du manifeste sont relatifs au dossier de sortie (cf. is_up_to_date).
+
+    Args:
+        path: Fichier du manifeste
+
+    Returns:
+        Manifeste, ou dict vide s'il est absent/illisible
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_FILE) -> None:
+    """Ecrit le manifeste des pages generees (ecriture atomique)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest: dict, region_key: str, fingerprint: str,
+                  output_dir: str = OUTPUT_DIR) -> bool:
+    """
+    Indique si la page d'une region peut etre conservee telle quelle.
+
+    Args:
+        manifest: Manifeste charge par load_manifest
+        region_key: Cle de la region
+        fingerprint: Empreinte courante (cf. forecast_fingerprint)
+        output_dir: Dossier de sortie
+
+    Returns:
+        True si l'empreinte est inchangee et que la page, ses fragments de
+        detail et ses pages de spot existent toujours
+    """
+    entry = manifest.get(region_key)
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    files = [entry.get('file', '')] + entry.get('shards', []) + entry.get('spots', [])
+    return all((Path(output_dir) / name).is_file() for name in files)
+
+
+def write_last_update(last_update: str, output_dir: str = OUTPUT_DIR) -> Path:
+    """
+    Ecrit l'horodatage du dernier run, lu par les pages au chargement.
+
+    Les pages inchangees ne sont pas regenerees: c'est ce petit fichier qui
+    porte la date de mise a jour affichee.
+
+    Args:
+        last_update: Date formatee (ex: "18/10/2026 09:00")
+        output_dir: Dossier de sortie
+
+    Returns:
+        Chemin du fichier ecrit
+    """
+    path = Path(output_dir) / LAST_UPDATE_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'last_update': last_update}, f)
+    return path
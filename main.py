@@ -1,31 +1,54 @@
 # Point d'entree principal - Generation du dashboard de previsions surf
+# Usage: python main.py [run|fetch|render] [--region CLE ...] [--snapshot FICHIER] [--force]
+import argparse
+import json
+import numpy as np
 import pandas as pd
-import shutil
 import os
 from datetime import datetime
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
-from webscrapping import load_data_all as aggregator
+import incremental
+from metrics import run_metrics
+from snapshot import read_snapshot, write_snapshot
+from assets import stylesheet_name, publish_stylesheet, prune_stylesheets, precompress
+from webscrapping.schema import map_categories, heights_as_float64
 from config import (
     REGIONS, REGION_ORDER, DEFAULT_REGION,
-    SURF_FORECAST_BASE_URL, OUTPUT_DIR, WIND_QUALITY
+    SURF_FORECAST_BASE_URL, OUTPUT_DIR, WIND_QUALITY, INCREMENTAL_BUILD, MANIFEST_FILE, TEMPLATE_PATH,
+    HISTORY_DB, SNAPSHOT_FILE, STYLESHEET_PATH, DETAIL_MODE, DETAIL_DIR,
+    SUMMARY_MAX_SPOTS, NATIONAL_PAGE, NATIONAL_KEY, NATIONAL_REGION, NATIONAL_TOP_N,
+    SPOT_PAGES, SPOT_DIR, SPOT_TEMPLATE_PATH
 )
 
+# Template des pages de region (dans le dossier de TEMPLATE_PATH)
+TEMPLATE_NAME = os.path.basename(TEMPLATE_PATH)
+
+# Template des pages de spot (meme dossier)
+SPOT_TEMPLATE_NAME = os.path.basename(SPOT_TEMPLATE_PATH)
+
 
 def spot_link(spot: str) -> str:
     """
-    Construit un lien cliquable vers la page surf-forecast.com d'un spot.
+    Construit un lien cliquable vers la prevision d'un spot.
 
     Args:
         spot: Nom du spot (slug URL surf-forecast)
 
     Returns:
-        Balise <a> HTML pointant vers la prevision du spot
+        Balise <a> HTML pointant vers la page du spot (SPOT_PAGES), ou
+        sinon vers sa prevision sur surf-forecast.com
     """
+    if SPOT_PAGES:
+        return f"<a href='{SPOT_DIR}/{spot}.html'>{spot}</a>"
     url = SURF_FORECAST_BASE_URL.format(spot=spot)
     return f"<a href='{url}' target='_blank'>{spot}</a>"
 
 
+def region_label(region_name: str) -> str:
+    """Nom de region accole au lien d'un spot dans la vue nationale."""
+    return f" <span class='spot-region'>{region_name}</span>"
+
+
 def rating_to_stars(rating: int) -> str:
     """
     Convertit un rating numerique en symboles etoiles.
@@ -90,7 +113,107 @@ def format_wind(speed, state: str, direction: str = '') -> dict:
     }
 
 
-def build_slots(df: pd.DataFrame) -> list:
+def _map_unique(series: pd.Series, func) -> pd.Series:
+    """
+    Applique une fonction de mise en forme a une colonne, une fois par valeur distincte.
+
+    Les colonnes categorielles (spot, directions...) sont formatees une fois
+    par categorie puis diffusees via leurs codes.
+
+    Args:
+        series: Colonne a formater
+        func: Fonction appliquee a chaque valeur distincte
+
+    Returns:
+        Serie des valeurs formatees (meme index que series)
+    """
+    return pd.Series(map_categories(series, func), index=series.index)
+
+
+def format_wind_columns(speed: pd.Series, state: pd.Series, direction: pd.Series) -> dict:
+    """
+    Equivalent vectorise de format_wind sur des colonnes entieres.
+
+    Args:
+        speed: Vitesses du vent
+        state: Etats du vent (Offshore, Onshore, Cross...)
+        direction: Directions (N, NE, SO...)
+
+    Returns:
+        Dict {type, force, dir, css} de Series alignees sur les colonnes d'entree
+    """
+    state = state.astype(object).fillna('').astype(str).str.strip()
+    direction = direction.astype(object).fillna('').astype(str).str.strip()
+    speed = pd.to_numeric(speed, errors='coerce').fillna(0).round().astype(int)
+
+    # Aucune donnee de vent exploitable: tout a "-" et css "wind-na"
+    missing = (state == '') & (speed == 0)
+    return {
+        'type': state.where((state != '') & ~missing, '-'),
+        'force': speed.astype(str).where(~missing, '-'),
+        'dir': direction.where((direction != '') & ~missing, '-'),
+        'css': state.map(WIND_QUALITY).fillna('wind-na').where(~missing, 'wind-na'),
+    }
+
+
+def with_forecast_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute les colonnes de houle et de vent absentes (compatibilite), a valeur neutre."""
+    extra = {}
+    for col in ['wave_height', 'wave_dir', 'period', 'wind_speed', 'wind_dir', 'wind_state']:
+        if col not in df.columns:
+            extra[col] = 0 if col in ['wave_height', 'period', 'wind_speed'] else ''
+    return df.assign(**extra) if extra else df
+
+
+def forecast_numbers(df: pd.DataFrame) -> tuple:
+    """
+    Hauteurs et periodes numeriques d'un frame de previsions (0 si absentes).
+
+    Les hauteurs float32 sont repassees en float64 arrondi (1.2 et non
+    1.2000000476837158).
+
+    Returns:
+        Tuple (heights, periods) de Series alignees sur df
+    """
+    heights = heights_as_float64(df['wave_height']).fillna(0.0)
+    periods = pd.to_numeric(df['period'], errors='coerce').fillna(0)
+    return heights, periods
+
+
+def format_detail_columns(df: pd.DataFrame, heights: pd.Series, periods: pd.Series) -> dict:
+    """
+    Met en forme les colonnes du detail d'un spot, une valeur par ligne de df.
+
+    Chaque format est calcule une fois par valeur distincte (cf. _map_unique).
+
+    Args:
+        df: Previsions (colonnes completes, cf. with_forecast_columns), rating entier
+        heights: Hauteurs numeriques (cf. forecast_numbers)
+        periods: Periodes numeriques (cf. forecast_numbers)
+
+    Returns:
+        Dict {spot, rating, rating_stars, height, period, wind_type,
+        wind_force, wind_dir, wind_class} de Series alignees sur df
+    """
+    links = _map_unique(df['spot'], spot_link)
+    if 'region' in df.columns:
+        # Vue nationale (cf. national_frame): region du spot apres son lien
+        links = links + _map_unique(df['region'], region_label).to_numpy()
+    wind = format_wind_columns(df['wind_speed'], df['wind_state'], df['wind_dir'])
+    return {
+        'spot': links,
+        'rating': df['rating'],
+        'rating_stars': _map_unique(df['rating'], rating_to_stars),
+        'height': _map_unique(heights, format_height),
+        'period': _map_unique(periods, format_period),
+        'wind_type': wind['type'],
+        'wind_force': wind['force'],
+        'wind_dir': wind['dir'],
+        'wind_class': wind['css'],
+    }
+
+
+def build_slots(df: pd.DataFrame, max_spots: int = None, top_n: int = None) -> list:
     """
     Construit la liste des creneaux a afficher a partir du DataFrame brut.
 
@@ -98,8 +221,15 @@ def build_slots(df: pd.DataFrame) -> list:
     resume (meilleur spot + son vent/houle) et le detail de tous les spots tries
     par note decroissante.
 
+    Implementation vectorisee: un seul tri (key, rating decroissant), mise en
+    forme colonne par colonne, puis agregats par creneau sur les bornes de
+    groupes. Aucune boucle Python par ligne hors construction des dicts.
+
     Args:
         df: DataFrame brut des previsions (tous les spots, cf. load_data_all)
+        max_spots: Nombre maximal de meilleurs spots nommes dans la ligne
+                   resume, suivis du nombre de spots restants (None = tous)
+        top_n: Nombre maximal de spots par creneau, les mieux notes (None = tous)
 
     Returns:
         Liste de dicts, un par creneau, tries chronologiquement. Chaque dict:
@@ -111,67 +241,337 @@ def build_slots(df: pd.DataFrame) -> list:
     if df is None or df.empty:
         return []
 
-    df = df.copy()
-
     # Colonnes supplementaires si absentes (compatibilite)
-    for col in ['wave_height', 'wave_dir', 'period', 'wind_speed', 'wind_dir', 'wind_state']:
-        if col not in df.columns:
-            df[col] = 0 if col in ['wave_height', 'period', 'wind_speed'] else ''
+    df = with_forecast_columns(df)
 
-    slots = []
-    # groupby conserve l'ordre de tri par 'key' (sort=False) deja applique en amont
-    for key, group in df.groupby('key', sort=True):
-        # Tri des spots du creneau par note decroissante
-        group = group.sort_values('rating', ascending=False)
-
-        # Detail: tous les spots du creneau
-        detail = []
-        for _, row in group.iterrows():
-            wind = format_wind(row['wind_speed'], row['wind_state'], row['wind_dir'])
-            detail.append({
-                'spot': spot_link(row['spot']),
-                'rating': int(row['rating']),
-                'rating_stars': rating_to_stars(int(row['rating'])),
-                'height': format_height(row['wave_height']),
-                'period': format_period(row['period']),
-                'wind_type': wind['type'],
-                'wind_force': wind['force'],
-                'wind_dir': wind['dir'],
-                'wind_class': wind['css'],
-            })
-
-        # Resume: meilleur(s) spot(s) du creneau
-        best_rating = int(group['rating'].max())
-        best_rows = group[group['rating'] == best_rating]
-        best = best_rows.iloc[0]
-
-        # Noms des meilleurs spots (blanchis si rating invalide: 0 ou -1)
-        if best_rating > 0:
-            spots_html = ' <br> '.join(spot_link(s) for s in best_rows['spot'])
-        else:
-            spots_html = ''
+    # Tri unique et stable: creneaux chronologiques, puis spots par note
+    # decroissante (a note egale, l'ordre d'arrivee des spots est conserve)
+    df = df[df['key'].notna()]
+    if df.empty:
+        return []
+    ratings = df['rating'].to_numpy().astype(int)
+    order = np.lexsort((-ratings, df['key'].to_numpy()))
+    df = df.iloc[order].assign(rating=ratings[order])
+
+    # Bornes des groupes (un groupe = un creneau)
+    keys = df['key'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sizes = np.diff(np.r_[starts, len(df)])
+    if top_n:
+        # Seuls les top_n premiers spots de chaque creneau sont mis en forme
+        df = df[np.arange(len(df)) - np.repeat(starts, sizes) < top_n]
+        sizes = np.minimum(sizes, top_n)
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    group_ids = np.repeat(np.arange(len(starts)), sizes)
+
+    # Mise en forme colonne par colonne
+    ratings = df['rating'].to_numpy()
+    heights, periods = forecast_numbers(df)
+    detail_columns = format_detail_columns(df, heights, periods)
+    links = detail_columns['spot']
+    names = list(detail_columns)
+    records = [dict(zip(names, values)) for values in zip(*(col.tolist() for col in detail_columns.values()))]
+
+    # Agregats par creneau sur les meilleurs spots (note == note max du creneau)
+    best_ratings = ratings[starts]
+    is_best = ratings == np.repeat(best_ratings, sizes)
+    best_groups = group_ids[is_best]
+    best_links = links[is_best]
+    if max_spots:
+        # Resume de taille bornee: max_spots premiers noms, puis le nombre de
+        # spots restants (tous figurent dans le detail)
+        kept = best_links.groupby(best_groups).cumcount().to_numpy() < max_spots
+        hidden = (np.bincount(best_groups, minlength=len(starts))
+                  - np.bincount(best_groups[kept], minlength=len(starts))).tolist()
+        best_links = best_links[kept].groupby(best_groups[kept]).agg(' <br> '.join).tolist()
+        best_links = [names + f" <br> +{n} spots" if n else names for names, n in zip(best_links, hidden)]
+    else:
+        best_links = best_links.groupby(best_groups).agg(' <br> '.join).tolist()
+    best_heights = heights[is_best].groupby(best_groups).max().tolist()
+    best_periods = periods[is_best].groupby(best_groups).max().tolist()
 
-        wind = format_wind(best['wind_speed'], best['wind_state'], best['wind_dir'])
+    # Ligne resume: le premier spot du creneau (meilleure note)
+    first = df.iloc[starts]
+    slot_keys = first['key'].tolist()
+    slot_dates = pd.to_datetime(first['date']).dt.strftime('%d/%m/%Y').tolist()
+    slot_times = first['time'].tolist()
 
+    slots = []
+    for i, start in enumerate(starts.tolist()):
+        best_rating = int(best_ratings[i])
+        best = records[start]
         slots.append({
-            'key': key,
-            'date': pd.to_datetime(best['date']).strftime('%d/%m/%Y'),
-            'time': best['time'],
+            'key': slot_keys[i],
+            'date': slot_dates[i],
+            'time': slot_times[i],
             'rating': best_rating,
-            'rating_stars': rating_to_stars(best_rating),
-            'spots': spots_html,
-            'height': format_height(best_rows['wave_height'].max()),
-            'period': format_period(best_rows['period'].max()),
-            'wind_type': wind['type'],
-            'wind_force': wind['force'],
-            'wind_dir': wind['dir'],
-            'wind_class': wind['css'],
-            'detail': detail,
+            'rating_stars': best['rating_stars'],
+            # Noms des meilleurs spots (blanchis si rating invalide: 0 ou -1)
+            'spots': best_links[i] if best_rating > 0 else '',
+            'height': format_height(best_heights[i]),
+            'period': format_period(best_periods[i]),
+            'wind_type': best['wind_type'],
+            'wind_force': best['wind_force'],
+            'wind_dir': best['wind_dir'],
+            'wind_class': best['wind_class'],
+            'detail': records[start:start + sizes[i]],
         })
 
     return slots
 
 
+# Colonnes des previsions lues par le rendu d'une page (cf. build_slots et
+# with_forecast_columns): les seules reprises dans la vue nationale
+NATIONAL_COLUMNS = ['spot', 'key', 'date', 'time', 'rating', 'wave_height', 'wave_dir',
+                    'period', 'wind_speed', 'wind_dir', 'wind_state']
+
+
+def national_frame(frames: dict) -> pd.DataFrame:
+    """
+    Reunit les previsions de toutes les regions pour la page nationale.
+
+    Les frames deja consolides sont concatenes (colonnes de rendu seulement)
+    avec le nom de la region de chaque spot; un spot partage par plusieurs
+    regions n'est garde qu'une fois. Le classement par creneau est ensuite
+    fait par un seul tri global (cf. build_slots avec top_n), sans nouveau
+    scraping ni tri par region.
+
+    Args:
+        frames: Dict {cle_region: forecast_df} (cf. load_data_all)
+
+    Returns:
+        DataFrame des previsions de toutes les regions, colonne 'region' en plus
+    """
+    parts = []
+    for region_key in REGION_ORDER:
+        forecast_df = frames.get(region_key)
+        if forecast_df is None or forecast_df.empty:
+            continue
+        columns = [col for col in NATIONAL_COLUMNS if col in forecast_df.columns]
+        parts.append(forecast_df[columns].assign(region=REGIONS[region_key]['name']))
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True).drop_duplicates(['spot', 'key'], ignore_index=True)
+
+
+def national_region() -> dict:
+    """Pseudo-region de la page nationale (NATIONAL_REGION et tous les spots de REGIONS)."""
+    spots = dict.fromkeys(spot for key in REGION_ORDER for spot in REGIONS[key]['spots'])
+    return {**NATIONAL_REGION, 'spots': list(spots)}
+
+
+def spot_index(df: pd.DataFrame) -> tuple:
+    """
+    Indexe les previsions par spot, pour rendre toutes les pages de spot en un passage.
+
+    Le frame est trie une seule fois par (spot, creneau) puis mis en forme
+    colonne par colonne: les lignes de chaque spot forment alors une plage
+    contiguee [debut, fin), sans filtrer le frame une fois par spot.
+
+    Args:
+        df: Previsions consolidees (cf. load_data_all)
+
+    Returns:
+        Tuple (rows, index): rows = lignes mises en forme ({key, date, time,
+        rating, rating_stars, height, period, wind_type, wind_force,
+        wind_dir, wind_class}) dans l'ordre (spot, creneau); index =
+        {spot: (debut, fin)} dans rows
+    """
+    if df is None or df.empty:
+        return [], {}
+    df = with_forecast_columns(df)
+    df = df[df['key'].notna()]
+    if df.empty:
+        return [], {}
+
+    codes = pd.factorize(df['spot'])[0]
+    order = np.lexsort((df['key'].to_numpy(), codes))
+    ratings = df['rating'].to_numpy().astype(int)
+    df = df.iloc[order].assign(rating=ratings[order])
+    codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(df)]
+
+    heights, periods = forecast_numbers(df)
+    columns = format_detail_columns(df, heights, periods)
+    del columns['spot']
+    columns['key'] = df['key']
+    columns['date'] = _map_unique(df['date'], lambda date: pd.Timestamp(date).strftime('%d/%m/%Y'))
+    columns['time'] = df['time']
+    names = list(columns)
+    rows = [dict(zip(names, values)) for values in zip(*(col.tolist() for col in columns.values()))]
+
+    spots = df['spot'].to_numpy()[starts].tolist()
+    return rows, {str(spot): (start, stop) for spot, start, stop in zip(spots, starts.tolist(), stops.tolist())}
+
+
+def spot_context(spot: str, rows: list, region_key: str, all_regions: dict,
+                 last_update: str = None, stylesheet: str = None) -> dict:
+    """
+    Prepare les variables du template d'une page de spot (dans SPOT_DIR).
+
+    Args:
+        spot: Nom du spot
+        rows: Creneaux du spot (plage de spot_index)
+        region_key: Cle de la region du spot
+        all_regions: Dictionnaire de toutes les regions
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+        stylesheet: Feuille de style publiee (defaut: assets.stylesheet_name())
+
+    Returns:
+        Dict des variables du template
+    """
+    valid = [row for row in rows if row['rating'] > 0]
+    best = max(valid, key=lambda row: row['rating']) if valid else None
+    return {
+        'title': f"Go To Surf - {spot}",
+        'heading': "Go To Surf",
+        'spot': spot,
+        'region_name': all_regions[region_key]['name'],
+        'region_url': f"../{output_filename(region_key, all_regions)}",
+        'forecast_url': SURF_FORECAST_BASE_URL.format(spot=spot),
+        'last_update': last_update or datetime.now().strftime('%d/%m/%Y %H:%M'),
+        'best_session': {
+            'date': best['date'] if best else '-',
+            'time': best['time'] if best else '-',
+            'rating': best['rating_stars'] if best else '-',
+        },
+        'rows': rows,
+        'stylesheet': f"../{stylesheet or stylesheet_name()}",
+    }
+
+
+def write_spot_pages(region_key: str, all_regions: dict, forecast_df: pd.DataFrame,
+                     last_update: str = None, output_dir: str = OUTPUT_DIR, stylesheet: str = None) -> list:
+    """
+    Ecrit la page de chaque spot d'une region (OUTPUT_DIR/SPOT_DIR/<spot>.html).
+
+    Un seul index (cf. spot_index) et un seul template compile pour toutes
+    les pages: le cout reste lineaire en nombre de lignes de previsions.
+
+    Args:
+        region_key: Cle de la region
+        all_regions: Dictionnaire de toutes les regions
+        forecast_df: Previsions consolidees de la region
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+        output_dir: Dossier de sortie
+        stylesheet: Feuille de style publiee (cf. assets.publish_stylesheet)
+
+    Returns:
+        Chemins relatifs des pages ecrites
+    """
+    from renderer import get_renderer
+    rows, index = spot_index(forecast_df)
+    if not index:
+        return []
+    spot_dir = Path(output_dir) / SPOT_DIR
+    spot_dir.mkdir(parents=True, exist_ok=True)
+    pages = (
+        (spot_dir / f"{spot}.html",
+         spot_context(spot, rows[start:stop], region_key, all_regions, last_update, stylesheet))
+        for spot, (start, stop) in index.items()
+    )
+    get_renderer().render_all_to(pages, SPOT_TEMPLATE_NAME)
+    return [f"{SPOT_DIR}/{spot}.html" for spot in index]
+
+
+def prune_spot_pages(keep: set, output_dir: str = OUTPUT_DIR) -> list:
+    """
+    Supprime les pages de spot qu'aucune region ne reference plus (copies precompressees comprises).
+
+    Args:
+        keep: Chemins relatifs des pages a conserver (ex: 'spots/La-Torche.html')
+        output_dir: Dossier de sortie
+
+    Returns:
+        Chemins supprimes
+    """
+    removed = []
+    for path in (Path(output_dir) / SPOT_DIR).glob('*.html*'):
+        if f"{SPOT_DIR}/{path.name.split('.html')[0]}.html" not in keep:
+            path.unlink()
+            removed.append(path)
+    return removed
+
+
+# Colonnes du detail d'un spot publiees dans les fragments JSON (rating_stars
+# est recalcule par la page a partir de rating)
+SHARD_COLUMNS = ['rating', 'height', 'period', 'wind_type', 'wind_force', 'wind_dir', 'wind_class']
+
+
+def detail_shards(slots: list, region_slug: str) -> dict:
+    """
+    Regroupe le detail des creneaux en fragments JSON, un par jour.
+
+    Chaque fragment est colonnaire: les liens des spots n'y figurent qu'une
+    fois (liste 'spots', referencee par indice), chaque colonne du detail est
+    une liste unique pour tous les creneaux du jour, et 'slots' donne les
+    bornes [debut, fin) de chaque creneau dans ces colonnes. Les creneaux
+    recoivent 'shard' (fichier du fragment) et 'slot_id' (cle dans 'slots'):
+    la page n'inclut alors que les lignes resume.
+
+    Args:
+        slots: Creneaux (cf. build_slots), completes sur place
+        region_slug: Slug de la region (dossier des fragments)
+
+    Returns:
+        Dict {chemin relatif du fragment: contenu serialisable en JSON}
+    """
+    shards = {}
+    spot_indexes = {}
+    for slot in slots:
+        key = pd.Timestamp(slot['key'])
+        name = f"{DETAIL_DIR}/{region_slug}/{key.strftime('%Y-%m-%d')}.json"
+        if name not in shards:
+            shards[name] = {'spots': [], 'slots': {},
+                            'columns': {col: [] for col in ['spot'] + SHARD_COLUMNS}}
+            spot_indexes[name] = {}
+        shard, index = shards[name], spot_indexes[name]
+        columns = shard['columns']
+        slot_id = key.strftime('%H:%M')
+        start = len(columns['spot'])
+        for record in slot['detail']:
+            spot = index.get(record['spot'])
+            if spot is None:
+                spot = index[record['spot']] = len(shard['spots'])
+                shard['spots'].append(record['spot'])
+            columns['spot'].append(spot)
+            for col in SHARD_COLUMNS:
+                columns[col].append(record[col])
+        shard['slots'][slot_id] = [start, len(columns['spot'])]
+        slot['shard'] = name
+        slot['slot_id'] = slot_id
+    return shards
+
+
+def write_detail_shards(shards: dict, region_slug: str, output_dir: str = OUTPUT_DIR) -> list:
+    """
+    Ecrit les fragments de detail d'une region et supprime ceux des jours passes.
+
+    Args:
+        shards: Fragments (cf. detail_shards)
+        region_slug: Slug de la region
+        output_dir: Dossier de sortie
+
+    Returns:
+        Chemins relatifs des fragments ecrits
+    """
+    shard_dir = Path(output_dir) / DETAIL_DIR / region_slug
+    if shards:
+        shard_dir.mkdir(parents=True, exist_ok=True)
+    for name, shard in shards.items():
+        path = Path(output_dir) / name
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(shard, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmp_path, path)
+    # Jours sortis de la fenetre de prevision (copies precompressees comprises)
+    current = {Path(name).name for name in shards}
+    for path in shard_dir.glob('*.json*'):
+        if path.name.split('.json')[0] + '.json' not in current:
+            path.unlink()
+    return sorted(shards)
+
+
 def find_best_session(slots: list) -> dict:
     """
     Trouve la meilleure session (rating le plus eleve) parmi les creneaux.
@@ -195,24 +595,22 @@ def find_best_session(slots: list) -> dict:
     }
 
 
-def generate_html(slots: list, best_session: dict,
-                  region_key: str, all_regions: dict) -> str:
+def page_context(slots: list, best_session: dict, region_key: str, all_regions: dict,
+                 last_update: str = None, stylesheet: str = None) -> dict:
     """
-    Genere le HTML final a partir du template et des donnees.
+    Prepare les variables du template d'une page de region.
 
     Args:
         slots: Liste des creneaux a afficher (cf. build_slots)
         best_session: Infos sur la meilleure session
         region_key: Cle de la region actuelle
         all_regions: Dictionnaire de toutes les regions
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+        stylesheet: Feuille de style publiee (defaut: assets.stylesheet_name())
 
     Returns:
-        Contenu HTML complet
+        Dict des variables du template
     """
-    # Configuration Jinja2
-    env = Environment(loader=FileSystemLoader('templates'))
-    template = env.get_template('index.html')
-
     region_info = all_regions[region_key]
 
     # Preparation des donnees des regions pour le selecteur
@@ -225,32 +623,70 @@ def generate_html(slots: list, best_session: dict,
             'url': 'index.html' if key == DEFAULT_REGION else f"{reg['slug']}.html",
             'is_current': key == region_key
         })
+    if NATIONAL_PAGE:
+        regions_list.append({
+            'key': NATIONAL_KEY,
+            'name': NATIONAL_REGION['name'],
+            'url': f"{NATIONAL_REGION['slug']}.html",
+            'is_current': region_key == NATIONAL_KEY,
+        })
 
-    # Rendu du template
-    html_output = template.render(
-        title=f"Go To Surf - {region_info['name']}",
-        heading="Go To Surf",
-        region_name=region_info['name'],
-        regions=regions_list,
-        current_region=region_key,
-        last_update=datetime.now().strftime('%d/%m/%Y %H:%M'),
-        best_session=best_session,
-        slots=slots
-    )
+    return {
+        'title': f"Go To Surf - {region_info['name']}",
+        'heading': "Go To Surf",
+        'region_name': region_info['name'],
+        'regions': regions_list,
+        'current_region': region_key,
+        'last_update': last_update or datetime.now().strftime('%d/%m/%Y %H:%M'),
+        'best_session': best_session,
+        'slots': slots,
+        'stylesheet': stylesheet or stylesheet_name(),
+    }
 
-    return html_output
 
+def generate_html(slots: list, best_session: dict,
+                  region_key: str, all_regions: dict, last_update: str = None) -> str:
+    """
+    Genere le HTML final a partir du template et des donnees.
 
-def process_region(region_key: str, all_regions: dict) -> tuple:
+    Args:
+        slots: Liste des creneaux a afficher (cf. build_slots)
+        best_session: Infos sur la meilleure session
+        region_key: Cle de la region actuelle
+        all_regions: Dictionnaire de toutes les regions
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+
+    Returns:
+        Contenu HTML complet
     """
-    Traite une region complete: chargement des donnees et generation HTML.
+    from renderer import get_renderer
+    context = page_context(slots, best_session, region_key, all_regions, last_update)
+    return get_renderer().render(TEMPLATE_NAME, **context)
+
+
+def output_filename(region_key: str, all_regions: dict) -> str:
+    """Nom du fichier HTML d'une region (index.html pour la region par defaut)."""
+    if region_key == DEFAULT_REGION:
+        return 'index.html'
+    return f"{all_regions[region_key]['slug']}.html"
+
+
+def prepare_region(region_key: str, all_regions: dict,
+                   forecast_df: pd.DataFrame = None, max_spots: int = None,
+                   top_n: int = None) -> tuple:
+    """
+    Charge (si besoin) les previsions d'une region et construit ses creneaux.
 
     Args:
         region_key: Cle de la region a traiter
         all_regions: Dictionnaire de toutes les regions
+        forecast_df: Previsions deja consolidees de la region (cf.
+                     load_data_all); chargees ici si absentes
+        max_spots: Meilleurs spots nommes par ligne resume (cf. build_slots)
+        top_n: Spots gardes par creneau (cf. build_slots)
 
     Returns:
-        Tuple (html_content, output_filename)
+        Tuple (slots, best_session)
     """
     region = all_regions[region_key]
     spots = region['spots']
@@ -258,31 +694,239 @@ def process_region(region_key: str, all_regions: dict) -> tuple:
     print(f"Traitement de {region['name']} ({len(spots)} spots)...")
 
     # Recuperation des donnees
-    forecast_df = aggregator.load_data_all(spots)
+    if forecast_df is None:
+        from webscrapping import load_data_all as aggregator
+        forecast_df = aggregator.load_data_all(spots)
 
     if forecast_df.empty:
         print(f"  Attention: Aucune donnee pour {region['name']}")
-        slots = []
-        best_session = {'date': '-', 'time': '-', 'rating': '-', 'spots': '-'}
-    else:
-        print(f"  {len(forecast_df)} previsions recuperees")
-        slots = build_slots(forecast_df)
-        best_session = find_best_session(slots)
+        return [], {'date': '-', 'time': '-', 'rating': '-', 'spots': '-'}
 
-    # Generation du HTML
-    html_content = generate_html(slots, best_session, region_key, all_regions)
+    print(f"  {len(forecast_df)} previsions recuperees")
+    with run_metrics.timer('build_slots', region=region_key) as event:
+        slots = build_slots(forecast_df, max_spots, top_n)
+        event['slots'] = len(slots)
+    return slots, find_best_session(slots)
 
-    # Nom du fichier de sortie
-    if region_key == DEFAULT_REGION:
-        output_filename = 'index.html'
-    else:
-        output_filename = f"{region['slug']}.html"
 
-    return html_content, output_filename
+def process_region(region_key: str, all_regions: dict,
+                   forecast_df: pd.DataFrame = None, last_update: str = None) -> tuple:
+    """
+    Traite une region complete: chargement des donnees et generation HTML.
+
+    Args:
+        region_key: Cle de la region a traiter
+        all_regions: Dictionnaire de toutes les regions
+        forecast_df: Previsions deja consolidees de la region (cf.
+                     load_data_all); chargees ici si absentes
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+
+    Returns:
+        Tuple (html_content, output_filename)
+    """
+    slots, best_session = prepare_region(region_key, all_regions, forecast_df)
+    html_content = generate_html(slots, best_session, region_key, all_regions, last_update)
+    return html_content, output_filename(region_key, all_regions)
 
 
-def main():
-    """Fonction principale d'execution."""
+def write_region(region_key: str, all_regions: dict, forecast_df: pd.DataFrame = None,
+                 last_update: str = None, output_dir: str = OUTPUT_DIR, stylesheet: str = None,
+                 detail_mode: str = DETAIL_MODE, top_n: int = None,
+                 spot_pages: bool = SPOT_PAGES) -> tuple:
+    """
+    Traite une region et ecrit sa page en flux, sans la materialiser en memoire.
+
+    Args:
+        region_key: Cle de la region a traiter
+        all_regions: Dictionnaire de toutes les regions
+        forecast_df: Previsions deja consolidees de la region (cf. load_data_all)
+        last_update: Date de mise a jour affichee (defaut: maintenant)
+        output_dir: Dossier de sortie
+        stylesheet: Feuille de style publiee (cf. assets.publish_stylesheet)
+        detail_mode: 'shards' (detail des creneaux en fragments JSON par
+                     jour, cf. detail_shards) ou 'inline' (detail dans la page)
+        top_n: Spots gardes par creneau (page nationale, cf. build_slots)
+        spot_pages: Ecrit aussi la page de chaque spot (cf. write_spot_pages)
+
+    Returns:
+        Tuple (chemin de la page ecrite, fragments de detail ecrits, pages de spot ecrites)
+    """
+    from renderer import get_renderer
+    # Detail en fragments: la page ne garde que des lignes resume de taille bornee
+    max_spots = SUMMARY_MAX_SPOTS if detail_mode == 'shards' else None
+    slots, best_session = prepare_region(region_key, all_regions, forecast_df, max_spots, top_n)
+    slug = all_regions[region_key]['slug']
+    with run_metrics.timer('detail_shards', region=region_key) as event:
+        # En mode 'inline', les fragments d'un run precedent sont supprimes
+        shards = detail_shards(slots, slug) if detail_mode == 'shards' else {}
+        shards = write_detail_shards(shards, slug, output_dir)
+        event['shards'] = len(shards)
+    context = page_context(slots, best_session, region_key, all_regions, last_update, stylesheet)
+    output_path = Path(output_dir) / output_filename(region_key, all_regions)
+    with run_metrics.timer('render', region=region_key) as event:
+        get_renderer().render_to(output_path, TEMPLATE_NAME, **context)
+        event['bytes'] = output_path.stat().st_size
+    pages = []
+    if spot_pages:
+        with run_metrics.timer('spot_pages', region=region_key) as event:
+            pages = write_spot_pages(region_key, all_regions, forecast_df, last_update, output_dir, stylesheet)
+            event['pages'] = len(pages)
+    return output_path, shards, pages
+
+
+def fetch_regions(region_keys: list, run_time: datetime, snapshot_path: str = SNAPSHOT_FILE):
+    """
+    Phase de scraping: recupere les regions, alimente l'historique et ecrit l'instantane.
+
+    Toutes les regions sont recuperees en un seul lot (spots partages
+    recuperes une fois) et livrees des que leurs spots sont arrives (cf.
+    load_data_all.load_regions). L'instantane n'est ecrit qu'une fois toutes
+    les regions livrees.
+
+    Args:
+        region_keys: Regions a recuperer (cles de REGIONS)
+        run_time: Instant du run (historique et instantane)
+        snapshot_path: Fichier de l'instantane ('' = pas d'instantane)
+
+    Yields:
+        Tuples (cle_region, forecast_df) dans l'ordre de completion des regions
+    """
+    # Import differe: requests et bs4 ne sont charges que par la phase de scraping
+    from webscrapping import load_data_all as aggregator
+    from history import HistoryStore
+
+    # Historique des previsions de chaque run (cf. history.py)
+    history = HistoryStore(HISTORY_DB) if HISTORY_DB else None
+    frames = {}
+    try:
+        region_spots = {key: REGIONS[key]['spots'] for key in region_keys}
+        for region_key, forecast_df in aggregator.load_regions(region_spots):
+            if history is not None:
+                with run_metrics.timer('history', region=region_key) as event:
+                    event['rows'] = history.append_run(forecast_df, run_time)
+            frames[region_key] = forecast_df
+            yield region_key, forecast_df
+    finally:
+        if history is not None:
+            history.close()
+
+    if snapshot_path:
+        path = write_snapshot(frames, run_time, snapshot_path)
+        print(f"Instantane: {path} ({len(frames)} regions)")
+
+
+def snapshot_regions(region_keys: list, snapshot: dict):
+    """
+    Regions d'un instantane (cf. snapshot.read_snapshot), dans l'ordre de region_keys.
+
+    Yields:
+        Tuples (cle_region, forecast_df); une region absente de l'instantane
+        est signalee et ignoree (sa page est conservee)
+    """
+    for region_key in region_keys:
+        if region_key in snapshot['regions']:
+            yield region_key, snapshot['regions'][region_key]
+        else:
+            print(f"{REGIONS[region_key]['name']}: absente de l'instantane, page conservee")
+
+
+def render_page(region_key: str, all_regions: dict, forecast_df: pd.DataFrame, manifest: dict,
+                last_update: str, stylesheet: str, force: bool = False, top_n: int = None) -> None:
+    """
+    Ecrit la page d'une region, sauf si ses previsions n'ont pas change (mode incremental).
+
+    Args:
+        region_key: Cle de la region (ou NATIONAL_KEY)
+        all_regions: Dictionnaire des regions contenant region_key
+        forecast_df: Previsions consolidees de la region
+        manifest: Manifeste des pages (cf. incremental.load_manifest), mis a jour sur place
+        last_update: Date de mise a jour affichee
+        stylesheet: Feuille de style publiee (cf. assets.publish_stylesheet)
+        force: Rend la page meme si ses previsions n'ont pas change
+        top_n: Spots gardes par creneau (page nationale, cf. build_slots)
+    """
+    # Mode incremental: page conservee si les previsions n'ont pas change
+    fingerprint = incremental.forecast_fingerprint(
+        forecast_df, incremental.render_context(region_key, REGIONS, REGION_ORDER, stylesheet)
+    )
+    if (INCREMENTAL_BUILD and not force
+            and incremental.is_up_to_date(manifest, region_key, fingerprint, OUTPUT_DIR)):
+        print(f"{all_regions[region_key]['name']}: previsions inchangees, page conservee")
+        run_metrics.record('region_skipped', region=region_key)
+        return
+
+    # Rendu ecrit en flux dans le fichier de sortie
+    # Pages de spot: celles des regions (la page nationale n'en ajoute pas)
+    output_path, shards, pages = write_region(region_key, all_regions, forecast_df, last_update,
+                                              OUTPUT_DIR, stylesheet, top_n=top_n,
+                                              spot_pages=SPOT_PAGES and region_key != NATIONAL_KEY)
+    manifest[region_key] = {'fingerprint': fingerprint, 'file': output_path.name,
+                            'stylesheet': stylesheet, 'shards': shards, 'spots': pages}
+
+    print(f"  -> {output_path}")
+
+
+def render_regions(regions, last_update: str, force: bool = False) -> None:
+    """
+    Phase de rendu: ecrit la page de chaque region au fil de l'eau, puis la page nationale.
+
+    Args:
+        regions: Iterable de (cle_region, forecast_df), ex: fetch_regions ou snapshot_regions
+        last_update: Date de mise a jour affichee
+        force: Rend toutes les pages, meme celles dont les previsions n'ont pas change
+    """
+    manifest = incremental.load_manifest(MANIFEST_FILE) if INCREMENTAL_BUILD else {}
+
+    # Feuille de style minifiee, publiee sous un nom derive de son contenu (cf. assets.py)
+    stylesheet = publish_stylesheet(OUTPUT_DIR, STYLESHEET_PATH)
+
+    frames = {}
+    for region_key, forecast_df in regions:
+        frames[region_key] = forecast_df
+        render_page(region_key, REGIONS, forecast_df, manifest, last_update, stylesheet, force)
+
+    # Page nationale: classement de toutes les regions, une fois toutes livrees
+    if NATIONAL_PAGE:
+        if set(frames) >= set(REGION_ORDER):
+            with run_metrics.timer('national', region=NATIONAL_KEY) as event:
+                national_df = national_frame(frames)
+                event['rows'] = len(national_df)
+            render_page(NATIONAL_KEY, {**REGIONS, NATIONAL_KEY: national_region()}, national_df,
+                        manifest, last_update, stylesheet, force, NATIONAL_TOP_N)
+        else:
+            print(f"{NATIONAL_REGION['name']}: regions incompletes, page conservee")
+
+    # Horodatage du run, lu par toutes les pages (y compris celles conservees)
+    incremental.write_last_update(last_update, OUTPUT_DIR)
+    if INCREMENTAL_BUILD:
+        incremental.save_manifest(manifest, MANIFEST_FILE)
+
+    with run_metrics.timer('assets') as event:
+        # Anciennes feuilles de style: conservees tant qu'une page les reference
+        if INCREMENTAL_BUILD:
+            keep = {entry.get('stylesheet') for entry in manifest.values()} | {stylesheet}
+            event['pruned'] = len(prune_stylesheets(keep, OUTPUT_DIR, STYLESHEET_PATH))
+            # Pages de spots retires de REGIONS
+            if SPOT_PAGES:
+                keep = {page for entry in manifest.values() for page in entry.get('spots', [])}
+                event['pruned'] += len(prune_spot_pages(keep, OUTPUT_DIR))
+        # Copies precompressees des fichiers publies (.gz, .br)
+        event['compressed'] = len(precompress(OUTPUT_DIR))
+
+
+def main(phase: str = 'run', regions: list = None, snapshot_path: str = SNAPSHOT_FILE,
+         force: bool = False):
+    """
+    Fonction principale d'execution.
+
+    Args:
+        phase: 'run' (scraping puis rendu de chaque region des son arrivee),
+               'fetch' (scraping et instantane seulement) ou 'render' (pages
+               depuis l'instantane, sans requete reseau)
+        regions: Cles de REGIONS a traiter (defaut: toutes, dans REGION_ORDER)
+        snapshot_path: Fichier de l'instantane des previsions
+        force: Rend toutes les pages, meme inchangees (phases run et render)
+    """
     print("=" * 50)
     print("Generation du dashboard de previsions surf")
     print("=" * 50)
@@ -290,28 +934,51 @@ def main():
     # Creer le dossier de sortie si necessaire
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # Traiter chaque region
-    for region_key in REGION_ORDER:
-        html_content, output_filename = process_region(region_key, REGIONS)
-
-        # Ecriture du fichier de sortie
-        output_path = Path(OUTPUT_DIR) / output_filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+    run_metrics.reset()
+    region_keys = [key for key in REGION_ORDER if regions is None or key in regions]
 
-        print(f"  -> {output_path}")
+    if phase == 'render':
+        snapshot = read_snapshot(snapshot_path)
+        if not snapshot['regions']:
+            print(f"Aucun instantane lisible: {snapshot_path} (lancer d'abord la phase fetch)")
+            return
+        last_update = snapshot['run_time'].strftime('%d/%m/%Y %H:%M')
+        render_regions(snapshot_regions(region_keys, snapshot), last_update, force)
+    else:
+        run_time = datetime.now()
+        fetched = fetch_regions(region_keys, run_time, snapshot_path)
+        if phase == 'fetch':
+            for region_key, forecast_df in fetched:
+                print(f"{REGIONS[region_key]['name']}: {len(forecast_df)} previsions recuperees")
+        else:
+            render_regions(fetched, run_time.strftime('%d/%m/%Y %H:%M'), force)
 
-    # Copie du CSS dans le dossier de sortie
-    css_source = Path('templates/styles.css')
-    css_dest = Path(OUTPUT_DIR) / 'styles.css'
-    if css_source.exists():
-        shutil.copy(css_source, css_dest)
-        print(f"\nCSS copie: {css_dest}")
+    # Rapport de metriques du run (latences, octets, temps de parsing et de rendu)
+    metrics_path = run_metrics.write(OUTPUT_DIR)
+    summary = run_metrics.summary()
+    print(f"\nMetriques: {metrics_path} ({summary['fetch']['count']} spots, "
+          f"{summary['fetch']['bytes'] / 1024:.0f} Ko, {summary['total_s']:.1f} s)")
 
     print("\n" + "=" * 50)
     print("Generation terminee!")
     print("=" * 50)
 
 
+def main_cli(argv=None) -> None:
+    """Interface en ligne de commande (cf. README: python main.py [fetch|render|run])."""
+    parser = argparse.ArgumentParser(description="Generation du dashboard de previsions surf")
+    parser.add_argument('phase', nargs='?', choices=['run', 'fetch', 'render'], default='run',
+                        help="run: scraping + rendu (defaut); fetch: scraping et instantane; "
+                             "render: pages depuis l'instantane, sans reseau")
+    parser.add_argument('--region', action='append', choices=REGION_ORDER, dest='regions',
+                        help="Region a traiter (repetable; defaut: toutes)")
+    parser.add_argument('--snapshot', default=SNAPSHOT_FILE,
+                        help="Fichier de l'instantane des previsions")
+    parser.add_argument('--force', action='store_true',
+                        help="Rend toutes les pages, meme celles dont les previsions n'ont pas change")
+    args = parser.parse_args(argv)
+    main(args.phase, args.regions, args.snapshot, args.force)
+
+
 if __name__ == '__main__':
-    main()
+    main_cli()
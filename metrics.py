@@ -0,0 +1,190 @@
+# Instrumentation du pipeline: evenements par etape et rapport metrics.json
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from config import METRICS_FILE, METRICS_LOG
+
+
+def percentile(values: list, q: float) -> float:
+    """
+    Percentile par rang le plus proche (sans interpolation).
+
+    Args:
+        values: Valeurs numeriques
+        q: Percentile entre 0 et 100
+
+    Returns:
+        Valeur du percentile, ou None si values est vide
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class RunMetrics:
+    """
+    Collecteur thread-safe des evenements d'un run.
+
+    Chaque evenement est un dict {event, t, ...} ou t est le temps ecoule
+    depuis le debut du run (secondes). Evenements emis par le pipeline:
+        fetch      spot, source, status, latency_s, bytes, retries, hedged
+        parse      spot, duration_s, rows
+        aggregate  duration_s, spots, rows
+        build_slots / render   region, duration_s (+ bytes pour render)
+        detail_shards          region, duration_s, shards (fragments JSON du detail)
+        national               region, duration_s, rows (previsions reunies pour la page nationale)
+        spot_pages             region, duration_s, pages (pages de spot de la region)
+        region_skipped         region (page inchangee, mode incremental)
+    """
+
+    def __init__(self, log: bool = METRICS_LOG):
+        """
+        Args:
+            log: Affiche aussi une ligne JSON par evenement
+        """
+        self.log = log
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Vide les evenements et redemarre le chronometre du run."""
+        with self._lock:
+            self.events = []
+            self.started_at = datetime.now()
+            self._start = time.perf_counter()
+
+    def record(self, event: str, **fields) -> dict:
+        """
+        Enregistre un evenement.
+
+        Args:
+            event: Nom de l'evenement (ex: 'fetch')
+            **fields: Champs de l'evenement (valeurs serialisables en JSON)
+
+        Returns:
+            Evenement enregistre
+        """
+        entry = {'event': event, 't': round(time.perf_counter() - self._start, 6), **fields}
+        with self._lock:
+            self.events.append(entry)
+        if self.log:
+            print(json.dumps(entry, ensure_ascii=False, default=str))
+        return entry
+
+    @contextmanager
+    def timer(self, event: str, **fields):
+        """
+        Chronometre un bloc et l'enregistre avec son champ duration_s.
+
+        Le dict produit peut etre complete dans le bloc (ex: nombre de lignes).
+
+        Args:
+            event: Nom de l'evenement
+            **fields: Champs initiaux de l'evenement
+        """
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            fields['duration_s'] = round(time.perf_counter() - start, 6)
+            self.record(event, **fields)
+
+    def summary(self) -> dict:
+        """
+        Agrege les evenements du run.
+
+        Returns:
+            Dict {total_s, fetch: {...}, parse: {...}, aggregate: {...}, regions: {...}}
+        """
+        with self._lock:
+            events = list(self.events)
+
+        def by_event(name):
+            return [e for e in events if e['event'] == name]
+
+        fetches = by_event('fetch')
+        network = [e for e in fetches if e.get('latency_s') is not None]
+        latencies = [e['latency_s'] for e in network]
+        sources = {}
+        for e in fetches:
+            sources[e.get('source', 'network')] = sources.get(e.get('source', 'network'), 0) + 1
+
+        parses = by_event('parse')
+        parse_times = [e['duration_s'] for e in parses]
+
+        regions = {}
+        for e in (by_event('build_slots') + by_event('detail_shards') + by_event('render')
+                  + by_event('spot_pages') + by_event('region_skipped')):
+            region = regions.setdefault(e['region'], {})
+            if e['event'] == 'region_skipped':
+                region['skipped'] = True
+            else:
+                region[f"{e['event']}_s"] = e['duration_s']
+                for field in ('bytes', 'shards', 'pages'):
+                    if field in e:
+                        region[field] = e[field]
+
+        return {
+            'total_s': round(time.perf_counter() - self._start, 6),
+            'fetch': {
+                'count': len(fetches),
+                'sources': sources,
+                'errors': sum(1 for e in fetches if e.get('error')),
+                'retries': sum(e.get('retries', 0) for e in fetches),
+                'hedged': sum(1 for e in fetches if e.get('hedged')),
+                'bytes': sum(e.get('bytes', 0) for e in fetches),
+                'latency_p50_s': percentile(latencies, 50),
+                'latency_p99_s': percentile(latencies, 99),
+                'latency_max_s': max(latencies) if latencies else None,
+                'slowest': [
+                    {'spot': e['spot'], 'latency_s': e['latency_s']}
+                    for e in sorted(network, key=lambda e: e['latency_s'], reverse=True)[:5]
+                ],
+            },
+            'parse': {
+                'count': len(parses),
+                'total_s': round(sum(parse_times), 6),
+                'max_s': max(parse_times) if parse_times else None,
+                'rows': sum(e.get('rows', 0) for e in parses),
+            },
+            'aggregate': {
+                'count': len(by_event('aggregate')),
+                'total_s': round(sum(e['duration_s'] for e in by_event('aggregate')), 6),
+            },
+            'regions': regions,
+        }
+
+    def write(self, output_dir: str) -> Path:
+        """
+        Ecrit le rapport du run (resume + evenements) dans output_dir/METRICS_FILE.
+
+        Args:
+            output_dir: Dossier de sortie du site
+
+        Returns:
+            Chemin du fichier ecrit
+        """
+        path = Path(output_dir) / METRICS_FILE
+        with self._lock:
+            events = list(self.events)
+        report = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'summary': self.summary(),
+            'events': events,
+        }
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+
+# Collecteur unique du processus, partage par le scraper et le rendu
+run_metrics = RunMetrics()
@@ -0,0 +1,126 @@
+# Rendu des pages: environnement Jinja2 unique, cache de bytecode et ecriture en flux
+import os
+import threading
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from jinja2.ext import Extension
+from config import TEMPLATE_PATH, TEMPLATE_CACHE_DIR, MINIFY_HTML
+from assets import minify_html
+
+
+class MinifyExtension(Extension):
+    """Reduit les blancs des templates HTML a la compilation (cf. assets.minify_html)."""
+
+    def preprocess(self, source, name, filename=None):
+        if name and name.endswith('.html'):
+            return minify_html(source)
+        return source
+
+
+class PageRenderer:
+    """
+    Environnement Jinja2 partage par toutes les pages d'un run.
+
+    Les templates ne sont compiles qu'une fois par processus (cache de
+    l'Environment), et leur bytecode est conserve sur disque entre les runs.
+    Les blancs du HTML sont reduits a la compilation (MINIFY_HTML), donc
+    sans cout au rendu. render_to() ecrit la page au fil du rendu, sans
+    construire la page complete en memoire.
+    """
+
+    def __init__(self, template_dir: str = None, cache_dir: str = TEMPLATE_CACHE_DIR,
+                 minify: bool = MINIFY_HTML):
+        """
+        Args:
+            template_dir: Dossier des templates (defaut: celui de TEMPLATE_PATH)
+            cache_dir: Dossier du cache de bytecode (None: pas de cache disque)
+            minify: Reduit les blancs des templates HTML (cf. assets.minify_html)
+        """
+        template_dir = template_dir or os.path.dirname(TEMPLATE_PATH) or '.'
+        bytecode_cache = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Bytecode distinct selon la minification (meme source, code different)
+            pattern = '__jinja2_%s.min.cache' if minify else '__jinja2_%s.cache'
+            bytecode_cache = FileSystemBytecodeCache(cache_dir, pattern)
+        self.env = Environment(loader=FileSystemLoader(template_dir),
+                               bytecode_cache=bytecode_cache,
+                               extensions=[MinifyExtension] if minify else [])
+
+    def render(self, template_name: str, **context) -> str:
+        """
+        Rend un template en memoire.
+
+        Args:
+            template_name: Nom du template (ex: 'index.html')
+            **context: Variables du template
+
+        Returns:
+            Contenu rendu
+        """
+        return self.env.get_template(template_name).render(**context)
+
+    def render_to(self, path, template_name: str, **context) -> Path:
+        """
+        Rend un template directement dans un fichier, en flux.
+
+        Le fichier est ecrit a cote puis renomme: une page a moitie ecrite
+        n'est jamais publiee.
+
+        Args:
+            path: Fichier de sortie
+            template_name: Nom du template (ex: 'index.html')
+            **context: Variables du template
+
+        Returns:
+            Chemin du fichier ecrit
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        self.env.get_template(template_name).stream(**context).dump(str(tmp_path), encoding='utf-8')
+        os.replace(tmp_path, path)
+        return path
+
+    def render_all_to(self, pages, template_name: str) -> int:
+        """
+        Rend un meme template dans une serie de petits fichiers (ex: pages de spot).
+
+        Le template n'est recherche qu'une fois pour toute la serie, et chaque
+        page est rendue en memoire puis ecrite d'un bloc: pour des pages de
+        quelques Ko, le rendu en flux coute surtout son decoupage en morceaux.
+
+        Args:
+            pages: Iterable de (fichier de sortie, variables du template)
+            template_name: Nom du template (ex: 'spot.html')
+
+        Returns:
+            Nombre de fichiers ecrits
+        """
+        template = self.env.get_template(template_name)
+        count = 0
+        for path, context in pages:
+            path = Path(path)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            tmp_path.write_text(template.render(**context), encoding='utf-8')
+            os.replace(tmp_path, path)
+            count += 1
+        return count
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PageRenderer:
+    """
+    Retourne le moteur de rendu unique du processus (cree au premier appel).
+
+    Returns:
+        Instance partagee de PageRenderer
+    """
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PageRenderer()
+    return _renderer
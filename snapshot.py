@@ -0,0 +1,231 @@
+# Instantane des previsions consolidees: relais entre les phases de scraping et de rendu
+#
+# Format binaire colonnaire, lisible par mmap sans copie:
+#
+#   MAGIC (8 octets) | version, taille de l'en-tete (2 x uint32 little-endian)
+#   en-tete JSON: run_time, run_times, et par region: nombre de lignes,
+#                 liste des spots, description de chaque colonne
+#   colonnes: tableaux numpy bruts, chacun aligne sur ALIGNMENT octets
+#
+# Les colonnes numeriques et dates sont relues comme des vues du fichier
+# mappe; les chaines sont encodees par dictionnaire (codes entiers + valeurs
+# distinctes dans l'en-tete), comme les colonnes categorielles du schema.
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import SNAPSHOT_FILE
+
+# Version du format (un instantane d'une autre version est ignore)
+SNAPSHOT_VERSION = 2
+
+# Signature en tete de fichier
+MAGIC = b'PYSURFSN'
+
+# Version et taille de l'en-tete JSON, apres la signature
+_PREFIX = struct.Struct('<II')
+
+# Alignement des colonnes dans le fichier (octets)
+ALIGNMENT = 64
+
+# Colonne portant l'index du frame quand ce n'est pas 0..n-1
+_INDEX_COLUMN = '__index__'
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _codes_dtype(size: int) -> np.dtype:
+    """Plus petit type entier signe pour des codes de dictionnaire (-1 = manquant)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _encode_column(name: str, values) -> tuple:
+    """
+    Decrit une colonne et le tableau numpy a ecrire pour elle.
+
+    Returns:
+        Tuple (description JSON, tableau contigu little-endian)
+
+    Raises:
+        TypeError: Type de colonne non pris en charge
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = values.cat.categories if isinstance(values, pd.Series) else values.categories
+        codes = values.cat.codes if isinstance(values, pd.Series) else values.codes
+        spec = {'name': name, 'kind': 'category', 'categories': categories.tolist(),
+                'categories_dtype': str(categories.dtype), 'ordered': bool(dtype.ordered)}
+        array = np.asarray(codes).astype(_codes_dtype(len(categories)), copy=False)
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufmM':
+        spec = {'name': name, 'kind': 'array'}
+        array = np.asarray(values)
+    elif pd.api.types.is_string_dtype(dtype):
+        codes, uniques = pd.factorize(values)
+        spec = {'name': name, 'kind': 'string', 'dictionary': [str(v) for v in uniques],
+                'dtype': str(dtype)}
+        array = codes.astype(_codes_dtype(len(uniques)), copy=False)
+    else:
+        raise TypeError(f"Colonne {name!r}: type {dtype} non pris en charge par l'instantane")
+
+    array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+    spec['buffer_dtype'] = array.dtype.str
+    return spec, array
+
+
+def _decode_column(spec: dict, buffer, data_offset: int, rows: int):
+    """Relit une colonne: vue du fichier mappe (tableaux, codes), ou chaines decodees."""
+    array = np.frombuffer(buffer, dtype=np.dtype(spec['buffer_dtype']), count=rows,
+                          offset=data_offset + spec['offset'])
+    if spec['kind'] == 'category':
+        categories = pd.Index(spec['categories'], dtype=spec['categories_dtype'])
+        dtype = pd.CategoricalDtype(categories, ordered=spec['ordered'])
+        return pd.Categorical.from_codes(array, dtype=dtype, validate=False)
+    if spec['kind'] == 'string':
+        # Codes -1 (manquants) -> dernier element, None
+        dictionary = np.array(spec['dictionary'] + [None], dtype=object)
+        return pd.array(dictionary[array], dtype=spec['dtype'])
+    return array
+
+
+def read_snapshot_header(path: str = SNAPSHOT_FILE) -> dict:
+    """
+    Lit l'en-tete de l'instantane, sans mapper les colonnes.
+
+    Args:
+        path: Fichier de l'instantane
+
+    Returns:
+        En-tete {version, run_time, run_times, data_offset, regions:
+        {cle_region: {rows, spots, index, columns}}}, ou None si le fichier
+        est absent, illisible ou d'une autre version
+    """
+    try:
+        with open(path, 'rb') as f:
+            prefix = f.read(len(MAGIC) + _PREFIX.size)
+            if len(prefix) < len(MAGIC) + _PREFIX.size or not prefix.startswith(MAGIC):
+                return None
+            version, header_size = _PREFIX.unpack(prefix[len(MAGIC):])
+            if version != SNAPSHOT_VERSION:
+                return None
+            header = json.loads(f.read(header_size).decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    header['data_offset'] = _aligned(len(MAGIC) + _PREFIX.size + header_size)
+    return header
+
+
+def read_snapshot(path: str = SNAPSHOT_FILE) -> dict:
+    """
+    Relit l'instantane des previsions, par mmap.
+
+    Seul pandas est necessaire a la lecture (ni requests ni bs4): la phase de
+    rendu peut regenerer les pages sans charger le scraper. Les colonnes
+    numeriques, les dates et les codes des colonnes categorielles sont des
+    vues en lecture seule du fichier mappe (aucune copie): un frame relu se
+    modifie apres .copy().
+
+    Args:
+        path: Fichier de l'instantane
+
+    Returns:
+        Dict {version, run_time (run le plus recent), regions: {cle_region:
+        forecast_df}, run_times: {cle_region: instant du run qui l'a produite}};
+        regions vide si le fichier est absent, illisible ou d'une autre version
+    """
+    header = read_snapshot_header(path)
+    if header is None:
+        return _empty_snapshot()
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return _empty_snapshot()
+
+    regions = {}
+    for region_key, meta in header['regions'].items():
+        rows = meta['rows']
+        columns = {spec['name']: _decode_column(spec, buffer, header['data_offset'], rows)
+                   for spec in meta['columns']}
+        index = columns.pop(_INDEX_COLUMN, None)
+        regions[region_key] = pd.DataFrame(columns, index=pd.RangeIndex(rows) if index is None else index,
+                                           copy=False)
+
+    return {
+        'version': header['version'],
+        'run_time': datetime.fromisoformat(header['run_time']) if header['run_time'] else None,
+        'regions': regions,
+        'run_times': {key: datetime.fromisoformat(value) for key, value in header['run_times'].items()},
+    }
+
+
+def _empty_snapshot() -> dict:
+    return {'version': SNAPSHOT_VERSION, 'run_time': None, 'regions': {}, 'run_times': {}}
+
+
+def write_snapshot(frames: dict, run_time: datetime, path: str = SNAPSHOT_FILE) -> Path:
+    """
+    Ecrit l'instantane des previsions (ecriture atomique).
+
+    Les regions absentes de frames (run limite a quelques regions) sont
+    conservees depuis l'instantane precedent.
+
+    Args:
+        frames: Dict {cle_region: forecast_df} (cf. load_data_all.consolidate_forecasts)
+        run_time: Instant du run
+        path: Fichier de l'instantane
+
+    Returns:
+        Chemin du fichier ecrit
+
+    Raises:
+        TypeError: Colonne d'un type non pris en charge (cf. _encode_column)
+    """
+    path = Path(path)
+    snapshot = read_snapshot(path)
+    snapshot['regions'].update(frames)
+    snapshot['run_times'].update({key: run_time for key in frames})
+    snapshot['run_time'] = max(snapshot['run_times'].values(), default=run_time)
+
+    # Description des colonnes et positions (relatives au debut des donnees)
+    regions, arrays, offset = {}, [], 0
+    for region_key, forecast_df in snapshot['regions'].items():
+        columns = [(name, forecast_df[name]) for name in forecast_df.columns]
+        if not forecast_df.index.equals(pd.RangeIndex(len(forecast_df))):
+            columns.append((_INDEX_COLUMN, forecast_df.index))
+        specs = []
+        for name, values in columns:
+            spec, array = _encode_column(name, values)
+            spec['offset'] = offset
+            offset = _aligned(offset + array.nbytes)
+            specs.append(spec)
+            arrays.append((spec['offset'], array))
+        spots = forecast_df['spot'].unique().tolist() if 'spot' in forecast_df.columns else []
+        regions[region_key] = {'rows': len(forecast_df), 'spots': [str(spot) for spot in spots],
+                               'columns': specs}
+
+    header = json.dumps({
+        'version': SNAPSHOT_VERSION,
+        'run_time': snapshot['run_time'].isoformat(),
+        'run_times': {key: value.isoformat() for key, value in snapshot['run_times'].items()},
+        'regions': regions,
+    }, ensure_ascii=False).encode('utf-8')
+    data_offset = _aligned(len(MAGIC) + _PREFIX.size + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + _PREFIX.pack(SNAPSHOT_VERSION, len(header)) + header)
+        for array_offset, array in arrays:
+            f.write(b'\0' * (data_offset + array_offset - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return path
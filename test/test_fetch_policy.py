@@ -0,0 +1,151 @@
+# Politique de requetes: nouvelles tentatives, echeance, requete de secours et coupe-circuit
+import threading
+import time
+import pytest
+from requests.exceptions import ConnectionError, TooManyRedirects
+import webscrapping.fetch_policy as fetch_policy
+from webscrapping.fetch_policy import CircuitBreaker, CircuitOpen, DeadlineExceeded, FetchPolicy
+
+URL = 'http://h/breaks/spot/forecasts/latest/six_day'
+
+
+class FakeResponse:
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b''
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    """Tentatives sans delai, timeout minimal court (echeances de quelques dixiemes de seconde)."""
+    monkeypatch.setattr(FetchPolicy, 'backoff', staticmethod(lambda attempt: 0.0))
+    monkeypatch.setattr(fetch_policy, 'MIN_REQUEST_TIMEOUT', 0.05)
+
+
+def policy(**options) -> FetchPolicy:
+    options = {'deadline': 10, 'request_timeout': 1, 'retries': 2, 'hedge_percentile': None, **options}
+    result = FetchPolicy(**options)
+    result.start_run()
+    return result
+
+
+def open_breaker(cooldown: float = 0.0) -> CircuitBreaker:
+    breaker = CircuitBreaker(error_rate=0.5, window=2, cooldown=cooldown)
+    breaker.record('h', False)
+    breaker.record('h', False)
+    return breaker
+
+
+def test_retries_stop_after_configured_attempts():
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        raise ConnectionError('boom')
+
+    with pytest.raises(ConnectionError):
+        policy(retries=2).fetch(URL, send)
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transient_status_returned_after_last_attempt(status):
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        return FakeResponse(status)
+
+    event = {}
+    assert policy(retries=2).fetch(URL, send, event).status_code == status
+    assert len(calls) == 3
+    assert event['retries'] == 2
+
+
+def test_retries_stop_at_deadline(monkeypatch):
+    monkeypatch.setattr(FetchPolicy, 'backoff', staticmethod(lambda attempt: 0.05))
+    calls = []
+
+    def send(timeout):
+        calls.append(timeout)
+        raise ConnectionError('boom')
+
+    with pytest.raises(ConnectionError):
+        policy(deadline=0.3, retries=100).fetch(URL, send)
+    assert 1 < len(calls) < 10
+    assert all(timeout <= 0.3 for timeout in calls)
+
+
+def test_hedged_request_wins_when_first_stalls():
+    hedging = policy(request_timeout=5, hedge_percentile=95)
+    for _ in range(fetch_policy.HEDGE_MIN_SAMPLES):
+        hedging.fetch(URL, lambda timeout: FakeResponse())
+
+    calls = []
+    lock = threading.Lock()
+
+    def send(timeout):
+        with lock:
+            calls.append(timeout)
+            first = len(calls) == 1
+        if first:
+            time.sleep(1.0)
+        return FakeResponse()
+
+    event = {}
+    start = time.perf_counter()
+    assert hedging.fetch(URL, send, event).status_code == 200
+    assert time.perf_counter() - start < 0.5
+    assert event['hedged'] and event['hedge_won']
+    assert len(calls) == 2
+
+
+def test_breaker_opens_at_error_rate_over_window():
+    breaker = CircuitBreaker(error_rate=0.5, window=4, cooldown=60)
+    for success in (True, False, False):
+        breaker.record('h', success)
+    assert breaker.allow('h')
+    breaker.record('h', True)
+    assert breaker.is_open('h')
+
+    with pytest.raises(CircuitOpen):
+        policy(breaker=breaker).fetch(URL, lambda timeout: FakeResponse())
+
+
+def test_half_open_trial_success_closes_breaker():
+    breaker = open_breaker()
+    assert policy(breaker=breaker).fetch(URL, lambda timeout: FakeResponse()).status_code == 200
+    assert not breaker.is_open('h')
+    assert breaker.allow('h')
+
+
+def test_half_open_trial_failure_reopens_breaker():
+    breaker = open_breaker(cooldown=60)
+    breaker._open_until['h'] = time.monotonic()
+
+    def send(timeout):
+        raise TooManyRedirects('boucle')
+
+    with pytest.raises(TooManyRedirects):
+        policy(breaker=breaker).fetch(URL, send)
+    assert breaker.is_open('h')
+    assert not breaker.allow('h')
+    assert not breaker._probing
+
+
+def test_half_open_trial_released_at_deadline():
+    breaker = open_breaker()
+
+    def throttle():
+        # Attente du limiteur de debit au-dela de l'echeance du run
+        time.sleep(0.2)
+        return 0.2
+
+    with pytest.raises(DeadlineExceeded):
+        policy(deadline=0.2, breaker=breaker).fetch(URL, lambda timeout: FakeResponse(), throttle=throttle)
+    assert not breaker._probing
+
+    # Run suivant: une nouvelle requete d'essai part et referme le coupe-circuit
+    assert policy(breaker=breaker).fetch(URL, lambda timeout: FakeResponse()).status_code == 200
+    assert not breaker.is_open('h')
@@ -0,0 +1,40 @@
+# Equivalence du moteur de dates vectorise (build_dates) et de build_date_sequence
+from datetime import date
+import numpy as np
+import pytest
+from webscrapping.load_data_all import build_date_sequence, build_dates
+
+START_DATES = [date(2026, 1, 30), date(2026, 2, 27), date(2026, 4, 30), date(2026, 12, 31)]
+
+SEQUENCES = {
+    'meme_mois': [30, 30, 30, 31, 31, 1, 1, 2],
+    'fevrier': [27, 27, 28, 28, 1, 1, 2, 3],
+    'jour_31_absent': [30, 30, 31, 31, 1, 2],
+    'premier_jour_0': [0, 0, 1, 1, 2],
+    'jour_0_en_cours': [30, 30, 31, 0, 0, 1],
+}
+
+
+def sequential(spots: list, days: list, start_date: date) -> np.ndarray:
+    """build_date_sequence applique spot par spot, dans l'ordre des lignes."""
+    result = np.empty(len(days), dtype='datetime64[D]')
+    for spot in dict.fromkeys(spots):
+        rows = [i for i, name in enumerate(spots) if name == spot]
+        result[rows] = build_date_sequence([days[i] for i in rows], start_date)
+    return result
+
+
+@pytest.mark.parametrize('start_date', START_DATES)
+@pytest.mark.parametrize('name', SEQUENCES)
+def test_build_dates_matches_sequence(name, start_date):
+    # Deux spots entrelaces: une sequence reguliere et la sequence testee
+    regular, tested = SEQUENCES['meme_mois'], SEQUENCES[name]
+    spots, days = [], []
+    for i in range(max(len(regular), len(tested))):
+        for spot, sequence in (('regulier', regular), (name, tested)):
+            if i < len(sequence):
+                spots.append(spot)
+                days.append(sequence[i])
+
+    expected = sequential(spots, days, start_date)
+    np.testing.assert_array_equal(build_dates(np.array(spots), np.array(days), start_date), expected)
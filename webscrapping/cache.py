@@ -0,0 +1,220 @@
+# Cache disque des previsions: HTML brut et cellules extraites, adresses par contenu
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import sys
+sys.path.append('..')
+from config import CACHE_DIR, CACHE_TTL, CACHE_MAX_BYTES
+
+# Suffixe des cellules extraites d'une page (cf. load_data_f.parse_cells). Les
+# objets d'un ancien format (previsions decodees, '.json') ne sont plus lus:
+# le spot est re-telecharge une fois, puis l'ancien objet est evince.
+CELLS_SUFFIX = '.cells.json'
+
+
+class ForecastCache:
+    """
+    Cache persistant des pages six_day et des cellules extraites.
+
+    Organisation du dossier:
+        objects/<sha256>.html        HTML brut de la reponse (adresse par son hash)
+        objects/<sha256>.cells.json  Cellules brutes correspondantes ({ligne: [textes]})
+        spots/<spot>.json            Derniere entree valide du spot:
+                               {hash, fetched_at, etag, last_modified}
+
+    Deux spots (ou deux runs) qui recoivent le meme contenu partagent les memes
+    objets. L'index par spot sert a la fois au TTL, au rejeu hors ligne, au
+    repli sur la derniere donnee valide et aux validateurs HTTP (GET conditionnel).
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, ttl: float = CACHE_TTL,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        """
+        Args:
+            directory: Dossier racine du cache
+            ttl: Duree (secondes) pendant laquelle une entree evite le reseau
+            max_bytes: Taille maximale des objets avant eviction (None: illimitee)
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def _object_path(self, digest: str, suffix: str) -> Path:
+        return self.directory / 'objects' / f"{digest}{suffix}"
+
+    def _spot_path(self, spot: str) -> Path:
+        return self.directory / 'spots' / f"{spot}.json"
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        # Fichier temporaire unique par thread: un run interrompu ou deux
+        # ecritures concurrentes ne laissent jamais de fichier tronque
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, spot: str) -> dict:
+        """
+        Retourne la derniere entree valide d'un spot.
+
+        Args:
+            spot: Nom du spot
+
+        Returns:
+            Dict {hash, fetched_at, etag, last_modified}, ou None si le spot
+            n'est pas en cache ou si sa prevision a ete evincee
+        """
+        try:
+            with open(self._spot_path(spot), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self._object_path(entry.get('hash', ''), CELLS_SUFFIX).exists():
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict, now: float = None) -> bool:
+        """Indique si une entree a ete recuperee il y a moins de TTL secondes."""
+        if not entry or not self.ttl:
+            return False
+        now = time.time() if now is None else now
+        return now - entry.get('fetched_at', 0) < self.ttl
+
+    def load_cells(self, entry: dict) -> dict:
+        """
+        Charge les cellules extraites d'une entree.
+
+        Args:
+            entry: Entree retournee par lookup()
+
+        Returns:
+            Dict des cellules (cf. load_data_f.parse_cells), ou None si
+            l'objet est absent/illisible
+        """
+        if not entry:
+            return None
+        path = self._object_path(entry['hash'], CELLS_SUFFIX)
+        try:
+            with open(path, encoding='utf-8') as f:
+                cells = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Date d'acces pour l'eviction (objets les moins recemment utilises en premier)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cells
+
+    def load_html(self, entry: dict) -> bytes:
+        """Retourne le HTML brut d'une entree, ou None s'il est absent."""
+        if not entry:
+            return None
+        try:
+            return self._object_path(entry['hash'], '.html').read_bytes()
+        except OSError:
+            return None
+
+    def store(self, spot: str, content: bytes, cells: dict, headers=None) -> dict:
+        """
+        Enregistre le HTML et les cellules extraites d'un spot.
+
+        Args:
+            spot: Nom du spot
+            content: HTML brut de la reponse
+            cells: Cellules extraites (cf. load_data_f.parse_cells)
+            headers: En-tetes de la reponse (ETag / Last-Modified conserves)
+
+        Returns:
+            Nouvelle entree du spot
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        html_path = self._object_path(digest, '.html')
+        if not html_path.exists():
+            self._write_atomic(html_path, content)
+        cells_path = self._object_path(digest, CELLS_SUFFIX)
+        if not cells_path.exists():
+            self._write_atomic(cells_path, json.dumps(cells, ensure_ascii=False).encode('utf-8'))
+
+        headers = headers or {}
+        entry = {
+            'hash': digest,
+            'fetched_at': time.time(),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        self._write_atomic(self._spot_path(spot), json.dumps(entry).encode('utf-8'))
+        return entry
+
+    def touch(self, spot: str, entry: dict) -> dict:
+        """
+        Marque une entree comme revalidee (reponse 304): son TTL repart de zero.
+
+        Args:
+            spot: Nom du spot
+            entry: Entree revalidee
+
+        Returns:
+            Entree mise a jour
+        """
+        entry = dict(entry, fetched_at=time.time())
+        self._write_atomic(self._spot_path(spot), json.dumps(entry).encode('utf-8'))
+        return entry
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """
+        Construit les en-tetes If-None-Match / If-Modified-Since d'une entree.
+
+        Args:
+            entry: Entree retournee par lookup() (ou None)
+
+        Returns:
+            Dict d'en-tetes conditionnels (vide si aucun validateur)
+        """
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def evict(self) -> int:
+        """
+        Supprime les objets les moins recemment utilises au-dela de max_bytes.
+
+        Les entrees de spots dont l'objet a disparu sont ignorees par lookup().
+
+        Returns:
+            Nombre d'octets liberes
+        """
+        if not self.max_bytes:
+            return 0
+        objects_dir = self.directory / 'objects'
+        with self._evict_lock:
+            files = []
+            for path in objects_dir.glob('*'):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in files)
+            freed = 0
+            for _, size, path in sorted(files):
+                if total - freed <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    freed += size
+                except OSError:
+                    pass
+        return freed
@@ -0,0 +1,127 @@
+# Decodage des cellules du tableau de prevision (houle, vent, etat du vent)
+import re
+import numpy as np
+import pandas as pd
+
+# Motifs precompiles des cellules de houle ("1.2W9": hauteur + direction +
+# periode) et de vent ("15E": vitesse + direction)
+SWELL_PATTERN = re.compile(r'^([\d.]+)\s*([A-Z]*)\s*(\d+)?')
+WIND_PATTERN = re.compile(r'^(\d+)\s*([A-Z]*)')
+
+# Libelles courts de surf-forecast -> etat canonique (cle de WIND_QUALITY)
+WIND_STATE_TRANSLATIONS = {
+    'off': 'Offshore',
+    'offshore': 'Offshore',
+    'on': 'Onshore',
+    'onshore': 'Onshore',
+    'cross': 'Cross',
+    'cross-shore': 'Cross',
+    'cross-off': 'Cross-off',
+    'cross-on': 'Cross-on',
+    'glass': 'Glass',
+    'glassy': 'Glass',
+}
+
+
+def _as_text_series(texts) -> pd.Series:
+    """Convertit des textes de cellules (liste, tableau ou Series) en Series nettoyee."""
+    return pd.Series(texts, dtype=object).fillna('').astype(str).str.strip()
+
+
+def parse_swell_cells(texts) -> tuple:
+    """
+    Parse en bloc des cellules de houle au format "1.2W9".
+
+    Une seule extraction vectorisee (Series.str.extract) sur toutes les
+    cellules, d'un ou de plusieurs spots a la fois. Une cellule vide ou
+    illisible (ex: "—") vaut (0.0, '', 0).
+
+    Args:
+        texts: Textes des cellules (ex: ["1.2W9", "2.3WSW11", "—"])
+
+    Returns:
+        Tuple (hauteurs float64, directions str, periodes int64) de tableaux numpy
+    """
+    parts = _as_text_series(texts).str.extract(SWELL_PATTERN)
+    heights = pd.to_numeric(parts[0], errors='coerce').fillna(0.0).astype('float64')
+    directions = parts[1].fillna('').astype(object)
+    periods = pd.to_numeric(parts[2], errors='coerce').fillna(0).astype('int64')
+    return heights.to_numpy(), directions.to_numpy(), periods.to_numpy()
+
+
+def parse_wind_cells(texts) -> tuple:
+    """
+    Parse en bloc des cellules de vent au format "15E" ou "10ESE".
+
+    Args:
+        texts: Textes des cellules (ex: ["15E", "10ESE", ""])
+
+    Returns:
+        Tuple (vitesses int64, directions str) de tableaux numpy
+    """
+    parts = _as_text_series(texts).str.extract(WIND_PATTERN)
+    speeds = pd.to_numeric(parts[0], errors='coerce').fillna(0).astype('int64')
+    directions = parts[1].fillna('').astype(object)
+    return speeds.to_numpy(), directions.to_numpy()
+
+
+def translate_wind_states(states) -> np.ndarray:
+    """
+    Normalise en bloc des etats du vent (cf. translate_wind_state).
+
+    Args:
+        states: Etats bruts (ex: ["off", "cross-on", "glassy"])
+
+    Returns:
+        Tableau numpy des etats canoniques; un libelle inconnu est conserve tel quel
+    """
+    raw = pd.Series(states, dtype=object).fillna('').astype(str)
+    return raw.str.lower().str.strip().map(WIND_STATE_TRANSLATIONS).fillna(raw).astype(object).to_numpy()
+
+
+def parse_swell(text: str) -> tuple:
+    """
+    Parse la houle depuis le format "1.2W9" (hauteur + direction + periode).
+
+    surf-forecast fusionne desormais hauteur, direction et periode dans une
+    seule cellule (ligne data-row="swell"). Une cellule vide vaut "—".
+
+    Args:
+        text: Texte contenant hauteur, direction et periode (ex: "1.2W9", "2.3WSW11")
+
+    Returns:
+        Tuple (hauteur_float, direction_string, periode_int)
+    """
+    heights, directions, periods = parse_swell_cells([text])
+    return (float(heights[0]), directions[0], int(periods[0]))
+
+
+def parse_wind(text: str) -> tuple:
+    """
+    Parse les donnees de vent depuis le format "15E" ou "10ESE".
+
+    Args:
+        text: Texte contenant vitesse et direction (ex: "15E", "10ESE")
+
+    Returns:
+        Tuple (vitesse_int, direction_string)
+    """
+    speeds, directions = parse_wind_cells([text])
+    return (int(speeds[0]), directions[0])
+
+
+def translate_wind_state(state: str) -> str:
+    """
+    Normalise l'etat du vent renvoye par surf-forecast.
+
+    Le site utilise des libelles courts (ex: "off", "on", "cross", "glassy")
+    en plus des formes "cross-off"/"cross-on". On les ramene a une forme
+    canonique stable (cle de WIND_QUALITY dans config.py).
+
+    Args:
+        state: Etat du vent brut (ex: "off", "cross-on", "glassy")
+
+    Returns:
+        Etat canonique (Offshore, Onshore, Cross, Cross-off, Cross-on, Glass)
+    """
+    return WIND_STATE_TRANSLATIONS.get(state.lower().strip(), state)
@@ -0,0 +1,113 @@
+# Tampon colonnaire des previsions: ajout spot par spot, decodage en un seul lot
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('..')
+from webscrapping.cells import parse_swell_cells, parse_wind_cells, translate_wind_states
+from webscrapping.schema import TIMES_OF_DAY, coerce_rating, schema_columns
+
+# Capacite initiale (lignes): ~ 50 spots x 21 creneaux
+INITIAL_CAPACITY = 1024
+
+# Cellules brutes d'un spot (cf. load_data_f.parse_cells), en plus du nom du spot
+CELL_COLUMNS = ['day', 'time', 'rating', 'swell', 'wind', 'wind_state']
+
+
+class ForecastBuffer:
+    """
+    Tampon colonnaire des previsions de plusieurs spots.
+
+    Chaque spot est ajoute sous forme de cellules brutes (textes du tableau
+    six_day, cf. load_data_f.parse_cells) dans des tableaux numpy
+    preallouees, agrandis par doublement: un ajout ne cree aucun DataFrame
+    et ne recopie pas les spots precedents (cout amorti constant). Le spot
+    et la periode sont internes en codes int32 des l'ajout.
+
+    to_frame() decode toutes les cellules en un seul lot (une extraction
+    vectorisee pour tous les spots) et construit un unique DataFrame au
+    schema compact, sans concatenation.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        """
+        Args:
+            capacity: Nombre de lignes preallouees
+        """
+        self._size = 0
+        self._capacity = max(1, capacity)
+        self._spots = {}
+        self._times = {time: code for code, time in enumerate(TIMES_OF_DAY)}
+        self._arrays = {'spot': np.empty(self._capacity, dtype=np.int32)}
+        for col in CELL_COLUMNS:
+            self._arrays[col] = np.empty(self._capacity, dtype=np.int32 if col == 'time' else object)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, rows: int) -> None:
+        """Agrandit les tableaux (doublement) pour accueillir rows lignes de plus."""
+        needed = self._size + rows
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for col, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[col] = grown
+        self._capacity = capacity
+
+    def append(self, cells: dict) -> int:
+        """
+        Ajoute les cellules brutes d'un spot.
+
+        Args:
+            cells: Dict {spot: nom, day/time/rating/swell/wind/wind_state:
+                   listes de textes de meme longueur} (cf. load_data_f.parse_cells);
+                   un dict vide est ignore
+
+        Returns:
+            Nombre de lignes ajoutees
+        """
+        rows = len(cells.get('day', ())) if cells else 0
+        if rows == 0:
+            return 0
+        self._reserve(rows)
+        start, stop = self._size, self._size + rows
+
+        self._arrays['spot'][start:stop] = self._spots.setdefault(cells['spot'], len(self._spots))
+        self._arrays['time'][start:stop] = [self._times.setdefault(time, len(self._times))
+                                            for time in cells['time']]
+        for col in ('day', 'rating', 'swell', 'wind', 'wind_state'):
+            self._arrays[col][start:stop] = cells[col]
+
+        self._size = stop
+        return rows
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Decode les cellules accumulees et construit le DataFrame des previsions.
+
+        Returns:
+            DataFrame aux colonnes de load_data_f.COLUMNS, au schema compact
+            (cf. schema.py); vide si aucune ligne n'a ete ajoutee
+        """
+        size = self._size
+        arrays = {col: array[:size] for col, array in self._arrays.items()}
+
+        heights, wave_dirs, periods = parse_swell_cells(arrays['swell'])
+        wind_speeds, wind_dirs = parse_wind_cells(arrays['wind'])
+        columns = schema_columns({
+            'spot': pd.Categorical.from_codes(arrays['spot'], categories=list(self._spots), validate=False),
+            'day': arrays['day'],
+            'time': pd.Categorical.from_codes(arrays['time'], categories=list(self._times), validate=False),
+            'rating': coerce_rating(arrays['rating']),
+            'wave_height': heights,
+            'wave_dir': wave_dirs,
+            'period': periods,
+            'wind_speed': wind_speeds,
+            'wind_dir': wind_dirs,
+            'wind_state': translate_wind_states(arrays['wind_state']),
+        })
+        return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,283 @@
+# Politique de requetes: echeance du run, nouvelles tentatives, requetes de secours, coupe-circuit
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+from requests.exceptions import RequestException, ConnectionError, Timeout
+import sys
+sys.path.append('..')
+from config import (
+    REQUEST_TIMEOUT, RUN_DEADLINE, MIN_REQUEST_TIMEOUT, FETCH_RETRIES,
+    RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES,
+    BREAKER_ERROR_RATE, BREAKER_WINDOW, BREAKER_COOLDOWN, MAX_WORKERS
+)
+from metrics import percentile
+
+# Statuts HTTP transitoires, retentes comme une erreur reseau
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Latences conservees pour le seuil des requetes de secours
+LATENCY_WINDOW = 200
+
+
+class DeadlineExceeded(RequestException):
+    """Echeance du run atteinte: plus assez de temps pour une requete."""
+
+
+class CircuitOpen(RequestException):
+    """Coupe-circuit ouvert: l'hote n'est plus interroge pendant le refroidissement."""
+
+
+class CircuitBreaker:
+    """
+    Coupe-circuit par hote.
+
+    Ouvert quand le taux d'erreurs des `window` dernieres requetes atteint
+    `error_rate`; apres `cooldown` secondes, une requete d'essai est laissee
+    passer (demi-ouvert): un succes le referme, un echec le rouvre, et une
+    requete d'essai partie sans issue est liberee (cf. release).
+    """
+
+    def __init__(self, error_rate: float = BREAKER_ERROR_RATE, window: int = BREAKER_WINDOW,
+                 cooldown: float = BREAKER_COOLDOWN):
+        self.error_rate = error_rate
+        self.window = window
+        self.cooldown = cooldown
+        self._outcomes = {}
+        self._open_until = {}
+        # Hotes demi-ouverts: thread qui porte la requete d'essai
+        self._probing = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host: str) -> bool:
+        """Indique si une requete vers l'hote peut partir."""
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return True
+            if time.monotonic() < open_until or host in self._probing:
+                return False
+            # Demi-ouvert: une seule requete d'essai
+            self._probing[host] = threading.get_ident()
+            return True
+
+    def record(self, host: str, success: bool) -> None:
+        """Enregistre l'issue d'une requete vers l'hote."""
+        with self._lock:
+            outcomes = self._outcomes.setdefault(host, deque(maxlen=self.window))
+            outcomes.append(success)
+            if self._probing.pop(host, None) is not None:
+                if success:
+                    self._open_until.pop(host, None)
+                    outcomes.clear()
+                else:
+                    self._open_until[host] = time.monotonic() + self.cooldown
+                return
+            failures = outcomes.count(False)
+            if len(outcomes) >= self.window and failures / len(outcomes) >= self.error_rate:
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+    def release(self, host: str) -> None:
+        """
+        Libere la requete d'essai du thread courant, partie sans issue (echeance
+        atteinte avant l'envoi, erreur inattendue): l'hote reste ouvert et une
+        autre requete d'essai pourra partir.
+        """
+        with self._lock:
+            if self._probing.get(host) == threading.get_ident():
+                del self._probing[host]
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            return host in self._open_until
+
+
+class FetchPolicy:
+    """
+    Execute une requete HTTP dans le budget de temps du run.
+
+    - Echeance globale: start_run() fixe la fin de la phase reseau; le timeout
+      de chaque tentative est min(REQUEST_TIMEOUT, temps restant).
+    - Nouvelles tentatives sur erreur reseau, timeout ou statut transitoire,
+      apres un delai exponentiel aleatoire (jamais au-dela de l'echeance).
+    - Requete de secours: si une tentative depasse le percentile
+      HEDGE_PERCENTILE des latences deja observees, une seconde requete est
+      envoyee et la premiere reponse recue est retenue.
+    - Coupe-circuit par hote (cf. CircuitBreaker).
+
+    La latence totale d'un run est ainsi bornee par l'echeance, et non par la
+    somme des pires cas de chaque spot.
+    """
+
+    def __init__(self, deadline: float = RUN_DEADLINE, request_timeout: float = REQUEST_TIMEOUT,
+                 retries: int = FETCH_RETRIES, hedge_percentile: float = HEDGE_PERCENTILE,
+                 breaker: CircuitBreaker = None):
+        """
+        Args:
+            deadline: Duree maximale de la phase reseau d'un run (secondes, None = illimitee)
+            request_timeout: Timeout maximal d'une tentative (secondes)
+            retries: Nombre de nouvelles tentatives apres un echec transitoire
+            hedge_percentile: Percentile de latence declenchant une requete de secours
+                              (None = desactive)
+            breaker: Coupe-circuit (defaut: un CircuitBreaker aux reglages de config)
+        """
+        self.deadline = deadline
+        self.request_timeout = request_timeout
+        self.retries = retries
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self._deadline_at = None
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=2 * MAX_WORKERS) if hedge_percentile else None
+
+    def start_run(self) -> None:
+        """Demarre le budget de temps d'un run (a appeler avant les requetes)."""
+        self._deadline_at = time.monotonic() + self.deadline if self.deadline else None
+        with self._lock:
+            self._latencies.clear()
+
+    def remaining(self) -> float:
+        """Temps restant avant l'echeance du run (inf si aucune echeance)."""
+        if self._deadline_at is None:
+            return float('inf')
+        return self._deadline_at - time.monotonic()
+
+    def _timeout(self) -> float:
+        timeout = min(self.request_timeout, self.remaining())
+        if timeout < MIN_REQUEST_TIMEOUT:
+            raise DeadlineExceeded("Echeance du run atteinte")
+        return timeout
+
+    def _record_latency(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def hedge_delay(self) -> float:
+        """Latence au-dela de laquelle une requete de secours part (None si pas assez d'observations)."""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            latencies = list(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(latencies, self.hedge_percentile)
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        """Delai avant la tentative attempt (1, 2...): exponentiel plafonne, moitie aleatoire."""
+        delay = min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _attempt(self, send, timeout: float, event: dict, throttle):
+        """Une tentative, doublee d'une requete de secours si elle tarde."""
+        delay = self.hedge_delay()
+        if self._hedge_pool is None or delay is None or delay >= timeout:
+            return send(timeout)
+
+        primary = self._hedge_pool.submit(send, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        # Requete de secours (limitation de debit comprise), dans le temps
+        # restant de la tentative. Son attente a lieu pendant la requete
+        # principale: elle n'est pas deduite de la latence (wait_s), et n'est
+        # reportee dans event (hedge_wait_s) que si le secours l'emporte; le
+        # thread de secours ne modifie jamais event.
+        backup_wait = []
+
+        def backup_send(backup_timeout):
+            if throttle is not None:
+                backup_wait.append(throttle())
+            return send(backup_timeout)
+
+        event['hedged'] = True
+        backup = self._hedge_pool.submit(backup_send, max(MIN_REQUEST_TIMEOUT, timeout - delay))
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except RequestException as e:
+                    error = e
+                    continue
+                event['hedge_won'] = future is backup
+                if future is backup:
+                    event['hedge_wait_s'] = round(sum(backup_wait, 0.0), 6)
+                return response
+        raise error
+
+    def fetch(self, url: str, send, event: dict = None, throttle=None):
+        """
+        Execute une requete selon la politique.
+
+        Args:
+            url: URL demandee (hote du coupe-circuit)
+            send: Fonction send(timeout) -> Response effectuant une tentative
+            event: Evenement de metriques du spot (wait_s, retries, hedged,
+                   hedge_won, hedge_wait_s)
+            throttle: Fonction sans argument appelee avant chaque envoi
+                      (limitation de debit), retournant son attente en
+                      secondes; l'attente avant la requete principale est
+                      cumulee dans event['wait_s'] et n'est comptee ni dans
+                      la latence ni dans le seuil de secours
+
+        Returns:
+            Reponse HTTP (un statut transitoire est retourne apres la derniere tentative)
+
+        Raises:
+            DeadlineExceeded: Echeance du run atteinte
+            CircuitOpen: Hote coupe apres trop d'erreurs
+            RequestException: Echec de la derniere tentative
+        """
+        event = event if event is not None else {}
+        host = urlparse(url).netloc
+        attempt = 0
+        while True:
+            # Echeance verifiee avant de prendre l'eventuelle requete d'essai
+            self._timeout()
+            if not self.breaker.allow(host):
+                raise CircuitOpen(f"Coupe-circuit ouvert pour {host}")
+            recorded = False
+            try:
+                if throttle is not None:
+                    event['wait_s'] = round(event.get('wait_s', 0.0) + throttle(), 6)
+                timeout = self._timeout()
+                start = time.perf_counter()
+                try:
+                    response = self._attempt(send, timeout, event, throttle)
+                except (ConnectionError, Timeout) as e:
+                    recorded = True
+                    self.breaker.record(host, False)
+                    failure = e
+                except RequestException:
+                    # Erreur non retentee (redirections, reponse tronquee...)
+                    recorded = True
+                    self.breaker.record(host, False)
+                    raise
+                else:
+                    recorded = True
+                    self._record_latency(time.perf_counter() - start)
+                    transient = response.status_code in RETRY_STATUSES
+                    self.breaker.record(host, not transient)
+                    if not transient:
+                        return response
+                    failure = response
+            finally:
+                # Aucune issue enregistree: la requete d'essai est liberee
+                if not recorded:
+                    self.breaker.release(host)
+
+            attempt += 1
+            delay = self.backoff(attempt)
+            if attempt > self.retries or delay + MIN_REQUEST_TIMEOUT > self.remaining():
+                if isinstance(failure, RequestException):
+                    raise failure
+                return failure
+            event['retries'] = attempt
+            time.sleep(delay)
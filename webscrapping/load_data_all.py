@@ -1,11 +1,18 @@
 # Fonction pour charger les donnees de tous les spots et selectionner les meilleurs par creneau
 from webscrapping import load_data_f as scraper
+import numpy as np
 import pandas as pd
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 import sys
 sys.path.append('..')
-from config import TIME_MAPPING
+from config import TIME_MAPPING, MAX_WORKERS, REFRESH_BUDGET, PARSE_WORKERS
+from metrics import run_metrics
+from webscrapping.schema import concat_frames, coerce_rating, map_categories
+from webscrapping.columnar import ForecastBuffer
+from webscrapping.scheduler import RefreshScheduler
+from webscrapping.pipeline import SpotPipeline
 
 
 def build_date_sequence(day_numbers: list, start_date: date = None) -> list:
@@ -92,6 +99,104 @@ def extract_day_number(day_string: str) -> int:
     return date.today().day
 
 
+def extract_day_numbers(days: pd.Series, today: date = None) -> np.ndarray:
+    """
+    Equivalent vectorise de extract_day_number sur une colonne entiere.
+
+    Une colonne ne compte que quelques libelles distincts (un par jour de
+    prevision): une seule extraction (str.extract) est faite sur ces
+    libelles, puis diffusee a toutes les lignes via leurs codes.
+
+    Args:
+        days: Jours au format surf-forecast (ex: "Vendredi19")
+        today: Date de reference du repli (defaut: aujourd'hui)
+
+    Returns:
+        Tableau des numeros de jours (jour courant si aucun chiffre final)
+    """
+    today = today or date.today()
+    codes, labels = pd.factorize(days.astype(str), use_na_sentinel=False)
+    numbers = pd.to_numeric(pd.Series(labels, dtype=object).str.extract(r'(\d+)$', expand=False),
+                            errors='coerce')
+    return numbers.fillna(today.day).astype('int64').to_numpy()[codes]
+
+
+def _days_in_month(months: np.ndarray) -> np.ndarray:
+    """Nombre de jours de chaque mois (tableau datetime64[M])."""
+    return ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype('int64')
+
+
+def build_dates(spots, day_numbers: np.ndarray, start_date: date = None) -> np.ndarray:
+    """
+    Reconstruit les dates de toutes les lignes, spot par spot, sans boucle par ligne.
+
+    Meme resultat que build_date_sequence applique a la sequence de chaque
+    spot: le premier jour est aujourd'hui, demain ou ce jour du mois courant;
+    chaque diminution du numero de jour (ex: 31 -> 1) passe au mois suivant.
+    Les passages de mois sont detectes par differences de numeros au sein de
+    chaque spot, puis les dates calculees en arithmetique datetime64 (mois de
+    depart + decalage de mois + numero de jour). Les spots dont un numero de
+    jour n'existe pas dans son mois (jour 0, 31 avril...: donnees
+    incoherentes) repassent par build_date_sequence.
+
+    Args:
+        spots: Spot de chaque ligne (Series categorielle ou tableau de codes/noms)
+        day_numbers: Numero de jour de chaque ligne (cf. extract_day_numbers);
+                     au sein d'un spot, les lignes sont dans l'ordre chronologique
+        start_date: Date de depart (defaut: aujourd'hui)
+
+    Returns:
+        Tableau datetime64[D] aligne sur les lignes
+    """
+    start_date = start_date or date.today()
+    day_numbers = np.asarray(day_numbers, dtype='int64')
+    if len(day_numbers) == 0:
+        return np.array([], dtype='datetime64[D]')
+    if isinstance(getattr(spots, 'dtype', None), pd.CategoricalDtype):
+        codes = spots.cat.codes.to_numpy()
+    else:
+        codes = pd.factorize(np.asarray(spots))[0]
+
+    # Regroupement par spot (tri stable: ordre chronologique conserve)
+    order = np.argsort(codes, kind='stable')
+    spot_codes, days = codes[order], day_numbers[order]
+    starts = np.r_[True, spot_codes[1:] != spot_codes[:-1]]
+    groups = np.cumsum(starts) - 1
+
+    # Decalage de mois: nombre de diminutions du numero de jour depuis le debut du spot
+    rollovers = np.r_[False, days[1:] < days[:-1]] & ~starts
+    total = np.cumsum(rollovers)
+    month_offsets = total - total[starts][groups]
+
+    # Premiere date de chaque spot: aujourd'hui, demain ou ce jour du mois courant
+    today = np.datetime64(start_date, 'D')
+    tomorrow = today + 1
+    first_days = days[starts]
+    current_month = today.astype('datetime64[M]')
+    in_month = first_days <= _days_in_month(np.array([current_month]))[0]
+    same_month = current_month.astype('datetime64[D]') + (first_days - 1)
+    first_dates = np.where(
+        first_days == start_date.day, today,
+        np.where(first_days == (start_date + timedelta(days=1)).day, tomorrow,
+                 np.where(in_month, same_month, today))
+    )
+
+    months = first_dates.astype('datetime64[M]')[groups] + month_offsets
+    dates = months.astype('datetime64[D]') + (days - 1)
+
+    # Donnees incoherentes (jour 0 ou inexistant dans son mois): calcul ligne a ligne
+    first_month_days = (first_dates - first_dates.astype('datetime64[M]').astype('datetime64[D]')).astype('int64') + 1
+    first_ok = first_month_days == first_days
+    irregular = ~first_ok[groups] | (days < 1) | (days > _days_in_month(months))
+    for group in np.unique(groups[irregular]):
+        rows = groups == group
+        dates[rows] = np.array(build_date_sequence(days[rows].tolist(), start_date), dtype='datetime64[D]')
+
+    result = np.empty(len(dates), dtype='datetime64[D]')
+    result[order] = dates
+    return result
+
+
 def map_time_to_hour(time_period: str) -> int:
     """
     Convertit une periode de la journee en heure numerique.
@@ -105,6 +210,134 @@ def map_time_to_hour(time_period: str) -> int:
     return TIME_MAPPING.get(time_period, 12)  # 12h par defaut
 
 
+def fetch_spots(list_spots: list, max_workers: int = MAX_WORKERS) -> ForecastBuffer:
+    """
+    Recupere les previsions de plusieurs spots en parallele.
+
+    Les requetes sont reparties sur un pool de threads borne (le debit par
+    hote reste limite par scraper.rate_limiter). Les cellules de chaque spot
+    sont ajoutees au tampon par le thread principal, dans l'ordre de
+    list_spots, comme en sequentiel.
+
+    Args:
+        list_spots: Liste des noms de spots
+        max_workers: Nombre maximal de requetes simultanees (1 = sequentiel)
+
+    Returns:
+        ForecastBuffer des spots (cf. columnar.py), dans l'ordre de list_spots
+    """
+    buffer = ForecastBuffer()
+    # Echeance de la phase reseau (cf. fetch_policy.py)
+    scraper.fetch_policy.start_run()
+    if not max_workers or max_workers <= 1 or len(list_spots) <= 1:
+        for spot in list_spots:
+            buffer.append(scraper.load_cells(spot))
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(list_spots))) as executor:
+            for cells in executor.map(scraper.load_cells, list_spots):
+                buffer.append(cells)
+
+    # Limite de taille du cache disque, une fois par lot de spots
+    scraper.forecast_cache.evict()
+    return buffer
+
+
+def plan_spots(region_spots: dict) -> list:
+    """
+    Union des spots de plusieurs regions, chaque slug une seule fois.
+
+    Args:
+        region_spots: Dict {cle_region: [spots]}
+
+    Returns:
+        Liste des spots distincts, dans l'ordre des regions puis des spots
+    """
+    return list(dict.fromkeys(spot for spots in region_spots.values() for spot in spots))
+
+
+def load_regions(region_spots: dict, max_workers: int = MAX_WORKERS,
+                 refresh_budget: int = REFRESH_BUDGET, parse_workers: int = PARSE_WORKERS):
+    """
+    Charge plusieurs regions en un seul lot de requetes et les livre au fil de l'eau.
+
+    Tous les spots distincts passent par le pipeline de chargement (cf.
+    pipeline.SpotPipeline: telechargement, parsing en processus separes,
+    files bornees); un spot partage par deux regions n'est recupere qu'une
+    fois. Cette fonction en est l'etage d'assemblage: des que tous les spots
+    d'une region sont arrives, sa prevision consolidee est produite, pendant
+    que le telechargement et le parsing des autres regions continuent. Le
+    rendu d'une region (cf. main) chevauche ainsi le reseau des suivantes, et
+    les cellules d'un spot sont liberees des que ses regions sont livrees.
+
+    Avec un budget de rafraichissement, seuls les spots prioritaires sont
+    re-telecharges (cf. scheduler.RefreshScheduler); les autres reutilisent
+    leur derniere prevision en cache. L'ensemble des requetes tient dans
+    l'echeance du run (cf. fetch_policy.FetchPolicy): un spot qui ne peut
+    plus etre recupere a temps sert sa derniere prevision en cache.
+
+    Args:
+        region_spots: Dict {cle_region: [spots]}, dans l'ordre de traitement souhaite
+        max_workers: Nombre maximal de requetes simultanees
+        refresh_budget: Nombre maximal de spots re-telecharges (None = tous)
+        parse_workers: Nombre de processus de parsing (0 = dans le processus principal)
+
+    Yields:
+        Tuples (cle_region, forecast_df) dans l'ordre de completion des regions
+        (cf. consolidate_forecasts pour le contenu de forecast_df)
+    """
+    spots = plan_spots(region_spots)
+    remaining = {key: set(region) for key, region in region_spots.items()}
+
+    # Regions sans spot: rien a attendre
+    for key in [key for key, pending in remaining.items() if not pending]:
+        del remaining[key]
+        yield key, consolidate_forecasts(ForecastBuffer())
+
+    cells = {}
+    if spots:
+        scheduler = RefreshScheduler(scraper.forecast_cache)
+        refresh = scheduler.plan(spots, refresh_budget)
+        scraper.fetch_policy.start_run()
+        pipeline = SpotPipeline(max_workers, parse_workers)
+        for spot, spot_cells in pipeline.stream(spots, refresh):
+            cells[spot] = spot_cells
+            scheduler.observe(spot, spot_cells)
+            for key in [key for key, pending in remaining.items() if spot in pending]:
+                remaining[key].discard(spot)
+                if not remaining[key]:
+                    del remaining[key]
+                    yield key, consolidate_forecasts(region_buffer(region_spots[key], cells))
+                    _release_cells(region_spots[key], remaining, cells)
+
+        scheduler.save()
+        # Limite de taille du cache disque, une fois par lot de spots
+        scraper.forecast_cache.evict()
+
+
+def _release_cells(spots: list, remaining: dict, cells: dict) -> None:
+    """Libere les cellules des spots dont aucune region restante n'a besoin."""
+    for spot in spots:
+        if not any(spot in pending for pending in remaining.values()):
+            cells.pop(spot, None)
+
+
+def region_buffer(spots: list, cells: dict) -> ForecastBuffer:
+    """
+    Tampon des cellules d'une region, dans l'ordre de ses spots.
+
+    Args:
+        spots: Spots de la region
+        cells: Dict {spot: cellules} (cf. load_data_f.load_cells)
+
+    Returns:
+        ForecastBuffer pre-dimensionne pour la region
+    """
+    buffer = ForecastBuffer(capacity=sum(len(cells[spot].get('day', ())) for spot in spots))
+    for spot in spots:
+        buffer.append(cells[spot])
+    return buffer
+
+
 def load_data_all(list_spots: list) -> pd.DataFrame:
     """
     Charge les donnees pour tous les spots et les consolide par creneau.
@@ -120,47 +353,68 @@ def load_data_all(list_spots: list) -> pd.DataFrame:
         DataFrame avec toutes les previsions consolidees, colonnes incluant
         rating (numerique), date, hour, key.
     """
-    # Collecte des donnees de tous les spots
-    all_data = []
-    for spot in list_spots:
-        spot_data = scraper.load_data(spot)
-        if not spot_data.empty:
-            all_data.append(spot_data)
+    return consolidate_forecasts(fetch_spots(list_spots))
+
+
+def consolidate_forecasts(forecasts) -> pd.DataFrame:
+    """
+    Consolide les previsions de plusieurs spots par creneau.
+
+    Args:
+        forecasts: ForecastBuffer des spots (cf. fetch_spots), ou liste de
+                   DataFrames des spots (cf. load_data_f.load_data) dans
+                   l'ordre des spots; les DataFrames vides sont ignores
+
+    Returns:
+        DataFrame avec toutes les previsions consolidees, colonnes incluant
+        rating (numerique), date, hour, key.
+    """
+    with run_metrics.timer('aggregate') as event:
+        forecast_df = _consolidate(forecasts)
+        event['spots'] = int(forecast_df['spot'].nunique()) if not forecast_df.empty else 0
+        event['rows'] = len(forecast_df)
+    return forecast_df
 
-    if not all_data:
+
+def _consolidate(forecasts) -> pd.DataFrame:
+    """Corps de consolidate_forecasts (hors instrumentation)."""
+    if isinstance(forecasts, ForecastBuffer):
+        # Un seul DataFrame construit sur les tableaux du tampon
+        forecast_df = forecasts.to_frame() if len(forecasts) else pd.DataFrame()
+    else:
+        # Concatenation en conservant les colonnes categorielles (cf. schema.py)
+        all_data = [spot_data for spot_data in forecasts if not spot_data.empty]
+        forecast_df = concat_frames(all_data) if all_data else pd.DataFrame()
+
+    if forecast_df.empty:
         print("Aucune donnee recuperee pour les spots")
         return pd.DataFrame()
 
-    forecast_df = pd.concat(all_data, ignore_index=True)
-
-    # Traitement des ratings
+    # Traitement des ratings (int8)
     # '!' indique une saturation/indisponibilite
-    forecast_df['rating'] = forecast_df['rating'].replace('!', -1)
-    forecast_df['rating'] = pd.to_numeric(forecast_df['rating'], errors='coerce').fillna(0).astype(int)
+    forecast_df['rating'] = coerce_rating(forecast_df['rating'])
 
-    # Conversion des periodes en heures
-    forecast_df['hour'] = forecast_df['time'].apply(map_time_to_hour)
+    # Conversion des periodes en heures (une fois par categorie)
+    forecast_df['hour'] = map_categories(forecast_df['time'], map_time_to_hour, missing=12, dtype='int8')
 
     # Creation d'un rang temporel pour le tri chronologique
-    forecast_df['time_rank'] = forecast_df.groupby('spot').cumcount()
+    forecast_df['time_rank'] = forecast_df.groupby('spot', observed=True).cumcount()
     forecast_df = forecast_df.sort_values('time_rank').reset_index(drop=True)
 
-    # Extraction des numeros de jours et construction des dates
-    day_numbers = forecast_df['day'].apply(extract_day_number).tolist()
-    dates = build_date_sequence(day_numbers)
-
-    # Attribution des dates
-    forecast_df['date'] = pd.to_datetime(dates)
+    # Dates par spot (numeros de jours extraits en un seul lot, cf. build_dates)
+    day_numbers = extract_day_numbers(forecast_df['day'])
+    forecast_df['date'] = build_dates(forecast_df['spot'], day_numbers).astype('datetime64[s]')
 
     # Creation de la cle de tri (date + heure)
-    forecast_df['key'] = pd.to_datetime(
-        forecast_df['date'].dt.strftime('%Y-%m-%d') + ' ' + forecast_df['hour'].astype(str) + ':00:00'
-    )
+    forecast_df['key'] = (
+        forecast_df['date'] + pd.to_timedelta(forecast_df['hour'].astype('int64'), unit='h')
+    ).astype('datetime64[us]')
 
     # Tri par cle temporelle (tous les spots sont conserves)
     forecast_df = forecast_df.sort_values('key')
 
-    # Colonne supplementaire pour reference
-    forecast_df['date_time'] = forecast_df['date'].dt.strftime('%Y-%m-%d') + '_' + forecast_df['time']
+    # Colonne supplementaire pour reference (une mise en forme par date distincte)
+    date_labels = map_categories(forecast_df['date'], lambda d: d.strftime('%Y-%m-%d'))
+    forecast_df['date_time'] = pd.Series(date_labels, index=forecast_df.index) + '_' + forecast_df['time'].astype(str)
 
     return forecast_df
@@ -1,191 +1,337 @@
 # Fonction pour charger les donnees d'un spot depuis surf-forecast.com
-import requests
 from requests.exceptions import RequestException
-from bs4 import BeautifulSoup
 import pandas as pd
-import re
+import time
+from datetime import datetime
 import sys
 sys.path.append('..')
-from config import SURF_FORECAST_BASE_URL, REQUEST_TIMEOUT
+from config import (
+    SURF_FORECAST_BASE_URL, REQUESTS_PER_SECOND, CONDITIONAL_GET, CACHE_MODE
+)
+from webscrapping.rate_limit import HostRateLimiter
+from webscrapping.fetch_policy import FetchPolicy
+from webscrapping.session import get_session
+from webscrapping.cache import ForecastCache
+from webscrapping.parsers import extract_rows
+from webscrapping.columnar import ForecastBuffer
+# Decodage des cellules (historiquement defini ici, reexporte pour compatibilite)
+from webscrapping.cells import (  # noqa: F401
+    SWELL_PATTERN, WIND_PATTERN, WIND_STATE_TRANSLATIONS,
+    parse_swell_cells, parse_wind_cells, translate_wind_states,
+    parse_swell, parse_wind, translate_wind_state,
+)
+from metrics import run_metrics
+
+# Limiteur partage par tous les threads de scraping (cf. load_data_all)
+rate_limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+
+# Cache disque: TTL, rejeu hors ligne, repli et validateurs HTTP (reponses 304)
+forecast_cache = ForecastCache()
+
+# Echeance du run, nouvelles tentatives, requetes de secours et coupe-circuit
+# (start_run() est appele au debut de chaque run, cf. load_data_all)
+fetch_policy = FetchPolicy()
+
+COLUMNS = ['spot', 'day', 'time', 'rating', 'wave_height', 'wave_dir',
+           'period', 'wind_speed', 'wind_dir', 'wind_state']
+
+
+def empty_forecast() -> pd.DataFrame:
+    """Prevision vide, aux colonnes et types du schema compact."""
+    return ForecastBuffer(capacity=1).to_frame()
+
+
+def forecast_frame(cells: dict) -> pd.DataFrame:
+    """
+    Decode les cellules brutes d'un spot en DataFrame (cf. columnar.ForecastBuffer).
+
+    Args:
+        cells: Cellules du spot (cf. parse_cells), eventuellement vides
+
+    Returns:
+        DataFrame avec colonnes COLUMNS, au schema compact
+    """
+    buffer = ForecastBuffer(capacity=len(cells.get('day', ())) if cells else 1)
+    buffer.append(cells)
+    return buffer.to_frame()
 
 
-def parse_swell(text: str) -> tuple:
+def load_data(spot: str) -> pd.DataFrame:
     """
-    Parse la houle depuis le format "1.2W9" (hauteur + direction + periode).
+    Scrape les donnees de prevision pour un spot de surf.
 
-    surf-forecast fusionne desormais hauteur, direction et periode dans une
-    seule cellule (ligne data-row="swell"). Une cellule vide vaut "—".
+    Cf. load_cells pour la strategie de cache; les cellules du spot sont
+    decodees en DataFrame (cf. forecast_frame).
 
     Args:
-        text: Texte contenant hauteur, direction et periode (ex: "1.2W9", "2.3WSW11")
+        spot: Nom du spot (ex: 'La-Sauzaie')
 
     Returns:
-        Tuple (hauteur_float, direction_string, periode_int)
+        DataFrame avec colonnes: spot, day, time, rating, wave_height, wave_dir,
+                                 period, wind_speed, wind_dir, wind_state
+        DataFrame vide en cas d'erreur sans donnee en cache
     """
-    text = text.strip()
-    if not text:
-        return (0.0, '', 0)
+    return forecast_frame(load_cells(spot))
+
 
-    # Extraire hauteur, direction (lettres) et periode (chiffres de fin)
-    match = re.match(r'^([\d.]+)\s*([A-Z]*)\s*(\d+)?', text)
-    if match:
-        height = float(match.group(1))
-        direction = match.group(2) if match.group(2) else ''
-        period = int(match.group(3)) if match.group(3) else 0
-        return (height, direction, period)
-    return (0.0, '', 0)
+def load_cells(spot: str, refresh: bool = True) -> dict:
+    """
+    Recupere les cellules brutes du tableau de prevision d'un spot.
+
+    Le cache disque (cf. webscrapping/cache.py) est consulte en premier:
+    - un spot recupere il y a moins de CACHE_TTL n'est pas re-telecharge;
+    - un spot non retenu par le planificateur (refresh=False, cf.
+      scheduler.py) sert sa derniere prevision en cache, quel que soit son age;
+    - en mode 'offline', la prevision est toujours relue depuis le cache;
+    - si la page n'a pas change (reponse 304 a un GET conditionnel), les
+      cellules extraites precedemment sont reutilisees;
+    - la requete suit fetch_policy (cf. fetch_policy.py): timeout borne par
+      l'echeance du run, nouvelles tentatives, requete de secours si elle tarde;
+    - en cas d'echec de la requete ou du parsing, les dernieres cellules
+      valides du spot sont servies plutot qu'une prevision vide.
+
+    Les cellules sont ajoutees telles quelles a un ForecastBuffer (cf.
+    load_data_all): aucun DataFrame n'est construit par spot.
 
+    Args:
+        spot: Nom du spot (ex: 'La-Sauzaie')
+        refresh: Re-telecharge la page si le cache n'est plus frais
 
-def parse_wind(text: str) -> tuple:
+    Returns:
+        Dict des cellules (cf. parse_cells), vide en cas d'erreur sans
+        donnee en cache
     """
-    Parse les donnees de vent depuis le format "15E" ou "10ESE".
+    event = fetch_event(spot)
+    try:
+        page = fetch_page(spot, event, refresh)
+        if 'cells' in page:
+            return page['cells']
+        return finish_page(page, parse_cells(page['content'], spot), event)
+    finally:
+        run_metrics.record('fetch', **event)
+
+
+def fetch_event(spot: str) -> dict:
+    """Evenement 'fetch' du rapport de metriques (cf. metrics.py), a completer au fil du chargement."""
+    return {'spot': spot, 'source': 'network', 'status': None, 'latency_s': None,
+            'wait_s': 0.0, 'bytes': 0, 'retries': 0, 'hedged': False}
+
+
+def fetch_page(spot: str, event: dict, refresh: bool = True) -> dict:
+    """
+    Etape reseau de load_cells: cache, requete HTTP et replis, sans parsing.
 
     Args:
-        text: Texte contenant vitesse et direction (ex: "15E", "10ESE")
+        spot: Nom du spot
+        event: Evenement de metriques du spot (cf. fetch_event)
+        refresh: Re-telecharge la page si le cache n'est plus frais
 
     Returns:
-        Tuple (vitesse_int, direction_string)
+        {'cells': cellules} si le spot est servi sans parsing (cache, 304,
+        repli apres erreur), sinon {'spot', 'entry', 'content', 'headers'}:
+        page a parser puis a passer a finish_page
     """
-    text = text.strip()
-    if not text:
-        return (0, '')
+    url = SURF_FORECAST_BASE_URL.format(spot=spot)
+    entry = forecast_cache.lookup(spot)
+
+    if CACHE_MODE == 'offline' or not refresh or forecast_cache.is_fresh(entry):
+        event['source'] = 'cache'
+        cached = forecast_cache.load_cells(entry)
+        if cached is not None:
+            return {'cells': cached}
+        if CACHE_MODE == 'offline':
+            cached = _parse_cached_html(spot, entry)
+            if cached is None:
+                print(f"Mode hors ligne: aucune donnee en cache pour {spot}")
+                event['error'] = 'offline-miss'
+                return {'cells': {}}
+            return {'cells': cached}
+        event['source'] = 'network'
+
+    # Requete HTTP avec gestion d'erreurs
+    headers = ForecastCache.conditional_headers(entry) if CONDITIONAL_GET else {}
+
+    def throttle():
+        return rate_limiter.wait(url)
+
+    def send(timeout):
+        return get_session().get(url, timeout=timeout, headers=headers)
+
+    try:
+        start = time.perf_counter()
+        response = fetch_policy.fetch(url, send, event, throttle)
+        event['latency_s'] = round(max(0.0, time.perf_counter() - start - event['wait_s']), 6)
+        event['status'] = response.status_code
+        event['bytes'] = len(response.content)
+        if response.headers.get('Content-Length'):
+            # Taille transferee (compressee), si le serveur l'annonce
+            event['wire_bytes'] = int(response.headers['Content-Length'])
+        if response.status_code == 304 and entry:
+            cached = forecast_cache.load_cells(entry)
+            if cached is not None:
+                event['source'] = 'not-modified'
+                forecast_cache.touch(spot, entry)
+                return {'cells': cached}
+        response.raise_for_status()
+    except RequestException as e:
+        print(f"Erreur lors du scraping de {spot}: {e}")
+        event['error'] = type(e).__name__
+        return {'cells': _stale_fallback(spot, entry, event)}
 
-    # Extraire le nombre et la direction
-    match = re.match(r'^(\d+)\s*([A-Z]*)', text)
-    if match:
-        speed = int(match.group(1))
-        direction = match.group(2) if match.group(2) else ''
-        return (speed, direction)
-    return (0, '')
+    return {'spot': spot, 'entry': entry, 'content': response.content, 'headers': response.headers}
 
 
-def translate_wind_state(state: str) -> str:
+def finish_page(page: dict, cells: dict, event: dict) -> dict:
+    """
+    Etape finale de load_cells: mise en cache des cellules parsees, ou repli.
+
+    Args:
+        page: Page telechargee (cf. fetch_page)
+        cells: Cellules extraites de la page (cf. parse_cells), vides si echec
+        event: Evenement de metriques du spot
+
+    Returns:
+        Cellules du spot (dernieres valides en cache si le parsing a echoue)
     """
-    Normalise l'etat du vent renvoye par surf-forecast.
+    if not cells:
+        event['error'] = 'parse'
+        return _stale_fallback(page['spot'], page['entry'], event)
 
-    Le site utilise des libelles courts (ex: "off", "on", "cross", "glassy")
-    en plus des formes "cross-off"/"cross-on". On les ramene a une forme
-    canonique stable (cle de WIND_QUALITY dans config.py).
+    forecast_cache.store(page['spot'], page['content'], cells, page['headers'])
+    return cells
+
+
+def _parse_cached_html(spot: str, entry: dict) -> dict:
+    """Reparse le HTML brut en cache d'un spot (None s'il est absent)."""
+    content = forecast_cache.load_html(entry)
+    if content is None:
+        return None
+    return parse_cells(content, spot) or None
+
+
+def _stale_fallback(spot: str, entry: dict, event: dict = None) -> dict:
+    """
+    Sert les dernieres cellules valides d'un spot apres un echec.
 
     Args:
-        state: Etat du vent brut (ex: "off", "cross-on", "glassy")
+        spot: Nom du spot
+        entry: Entree du cache (ou None)
+        event: Evenement de metriques du spot, marque 'stale' si le cache sert
 
     Returns:
-        Etat canonique (Offshore, Onshore, Cross, Cross-off, Cross-on, Glass)
-    """
-    translations = {
-        'off': 'Offshore',
-        'offshore': 'Offshore',
-        'on': 'Onshore',
-        'onshore': 'Onshore',
-        'cross': 'Cross',
-        'cross-shore': 'Cross',
-        'cross-off': 'Cross-off',
-        'cross-on': 'Cross-on',
-        'glass': 'Glass',
-        'glassy': 'Glass',
-    }
-    return translations.get(state.lower().strip(), state)
+        Dernieres cellules en cache, ou dict vide si aucune
+    """
+    cached = forecast_cache.load_cells(entry)
+    if cached is None:
+        return {}
+    fetched_at = datetime.fromtimestamp(entry['fetched_at']).strftime('%d/%m/%Y %H:%M')
+    print(f"  {spot}: utilisation de la derniere prevision en cache ({fetched_at})")
+    if event is not None:
+        event['source'] = 'stale'
+    return cached
 
 
-def load_data(spot: str) -> pd.DataFrame:
+def parse_forecast(content: bytes, spot: str) -> pd.DataFrame:
     """
-    Scrape les donnees de prevision pour un spot de surf.
+    Extrait la prevision d'un spot depuis le HTML de la page six_day.
 
     Args:
+        content: Contenu HTML brut de la page
         spot: Nom du spot (ex: 'La-Sauzaie')
 
     Returns:
         DataFrame avec colonnes: spot, day, time, rating, wave_height, wave_dir,
                                  period, wind_speed, wind_dir, wind_state
-        DataFrame vide en cas d'erreur
+        DataFrame vide si la structure de la page est inattendue
     """
-    url = SURF_FORECAST_BASE_URL.format(spot=spot)
-    columns = ['spot', 'day', 'time', 'rating', 'wave_height', 'wave_dir',
-               'period', 'wind_speed', 'wind_dir', 'wind_state']
-    empty_df = pd.DataFrame(columns=columns)
+    return forecast_frame(parse_cells(content, spot))
 
-    # Requete HTTP avec gestion d'erreurs
-    try:
-        response = requests.get(url, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-    except RequestException as e:
-        print(f"Erreur lors du scraping de {spot}: {e}")
-        return empty_df
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+def parse_cells(content: bytes, spot: str) -> dict:
+    """
+    Extrait les cellules brutes du tableau de prevision d'une page six_day.
+
+    Seules les lignes sont alignees (jours deplies selon leur colspan, lignes
+    tronquees ou completees a la meme longueur): le decodage de la houle, du
+    vent et des ratings est fait en un seul lot pour tous les spots par
+    columnar.ForecastBuffer.
 
-    # Helper: cellules de donnees d'une ligne data-row, en ignorant la
-    # premiere cellule (en-tete/unite, parfois un <th>) presente sur toutes
+    Args:
+        content: Contenu HTML brut de la page
+        spot: Nom du spot (ex: 'La-Sauzaie')
+
+    Returns:
+        Dict {spot: nom, day, time, rating, swell, wind, wind_state: listes
+        de textes de meme longueur}, vide si la structure de la page est
+        inattendue
+    """
+    with run_metrics.timer('parse', spot=spot) as event:
+        cells = _parse_cells(content, spot)
+        event['rows'] = len(cells.get('day', ()))
+    return cells
+
+
+def parse_page(content: bytes, spot: str) -> tuple:
+    """
+    Parse une page hors du processus principal (cf. pipeline.py).
+
+    L'evenement 'parse' ne peut pas etre enregistre dans le collecteur d'un
+    autre processus: sa duree est renvoyee avec les cellules.
+
+    Returns:
+        Tuple (cellules, duree du parsing en secondes)
+    """
+    start = time.perf_counter()
+    cells = _parse_cells(content, spot)
+    return cells, round(time.perf_counter() - start, 6)
+
+
+def _parse_cells(content: bytes, spot: str) -> dict:
+    """Corps de parse_cells (hors instrumentation)."""
+    # Cellules (texte, colspan) des lignes data-row du tableau de prevision
+    rows = extract_rows(content)
+
+    # Helper: textes des cellules de donnees d'une ligne data-row, en ignorant
+    # la premiere cellule (en-tete/unite, parfois un <th>) presente sur toutes
     # les lignes sauf 'time'.
     def data_cells(row_name, skip_header=True):
-        row = soup.find('tr', {'data-row': row_name})
-        if not row:
+        cells = rows.get(row_name)
+        if cells is None:
             return None
-        cells = row.find_all(["td", "th"], recursive=False)
         return cells[1:] if skip_header else cells
 
+    def texts(row_name):
+        cells = data_cells(row_name)
+        return [text for text, _ in cells] if cells else []
+
     # Extraction des jours
     days_cells = data_cells('days')
     if days_cells is None:
         print(f"Structure HTML inattendue pour {spot}: ligne 'days' non trouvee")
-        return empty_df
+        return {}
 
     days = []
-    for day_cell in days_cells:
-        colspan = int(day_cell.get('colspan', 1))
+    for day_name, colspan in days_cells:
         # data-day-name a disparu: on conserve le texte brut (ex: "Vendredi19")
-        day_name = day_cell.get_text(strip=True)
-        for _ in range(colspan):
-            days.append(day_name)
+        days.extend([day_name] * int(colspan))
 
     # Extraction des periodes (matin, apres-midi, soir): pas de cellule d'en-tete
     times_cells = data_cells('time', skip_header=False)
     if times_cells is None:
         print(f"Structure HTML inattendue pour {spot}: ligne 'time' non trouvee")
-        return empty_df
-
-    time_of_day = [time_cell.get_text(strip=True) for time_cell in times_cells]
-
-    # Extraction des ratings (ligne data-row="rating", echelle 0-10)
-    rating_cells = data_cells('rating')
-    ratings = [c.get_text(strip=True) for c in rating_cells] if rating_cells else []
-
-    # Extraction de la houle (hauteur + direction + periode fusionnees, ex: "1.2W9")
-    swell_cells = data_cells('swell')
-    wave_heights = []
-    wave_dirs = []
-    periods = []
-    if swell_cells:
-        for cell in swell_cells:
-            height, direction, period = parse_swell(cell.get_text(strip=True))
-            wave_heights.append(height)
-            wave_dirs.append(direction)
-            periods.append(period)
-
-    # Extraction du vent
-    wind_cells = data_cells('wind')
-    wind_speeds = []
-    wind_dirs = []
-    if wind_cells:
-        for cell in wind_cells:
-            speed, direction = parse_wind(cell.get_text(strip=True))
-            wind_speeds.append(speed)
-            wind_dirs.append(direction)
-
-    # Extraction de l'etat du vent
-    wind_state_cells = data_cells('wind-state')
-    wind_states = []
-    if wind_state_cells:
-        for cell in wind_state_cells:
-            state = translate_wind_state(cell.get_text(strip=True))
-            wind_states.append(state)
+        return {}
+
+    time_of_day = [text for text, _ in times_cells]
+
+    # Ratings (ligne data-row="rating", echelle 0-10), houle (hauteur +
+    # direction + periode fusionnees, ex: "1.2W9"), vent ("15E") et etat du vent
+    ratings = texts('rating')
 
     # Verification de la coherence des donnees de base
     min_length = min(len(days), len(time_of_day), len(ratings))
     if min_length == 0:
         print(f"Donnees incompletes pour {spot}")
-        return empty_df
+        return {}
 
     # Troncature si les longueurs different
     if not (len(days) == len(time_of_day) == len(ratings)):
@@ -194,28 +340,19 @@ def load_data(spot: str) -> pd.DataFrame:
         time_of_day = time_of_day[:min_length]
         ratings = ratings[:min_length]
 
-    # Ajuster les donnees supplementaires a la meme longueur
-    def pad_or_truncate(lst, target_len, default=0):
+    # Ajuster les donnees supplementaires a la meme longueur (une cellule
+    # vide se decode en 0 / '')
+    def pad_or_truncate(lst, target_len, default=''):
         if len(lst) < target_len:
             return lst + [default] * (target_len - len(lst))
         return lst[:target_len]
 
-    wave_heights = pad_or_truncate(wave_heights, min_length, 0.0)
-    wave_dirs = pad_or_truncate(wave_dirs, min_length, '')
-    periods = pad_or_truncate(periods, min_length, 0)
-    wind_speeds = pad_or_truncate(wind_speeds, min_length, 0)
-    wind_dirs = pad_or_truncate(wind_dirs, min_length, '')
-    wind_states = pad_or_truncate(wind_states, min_length, '')
-
-    return pd.DataFrame({
+    return {
         'spot': spot,
         'day': days,
         'time': time_of_day,
         'rating': ratings,
-        'wave_height': wave_heights,
-        'wave_dir': wave_dirs,
-        'period': periods,
-        'wind_speed': wind_speeds,
-        'wind_dir': wind_dirs,
-        'wind_state': wind_states
-    })
+        'swell': pad_or_truncate(texts('swell'), min_length),
+        'wind': pad_or_truncate(texts('wind'), min_length),
+        'wind_state': pad_or_truncate(texts('wind-state'), min_length),
+    }
@@ -0,0 +1,186 @@
+# Extraction des lignes data-row du tableau de prevision (parseur rapide + repli BeautifulSoup)
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+import sys
+sys.path.append('..')
+from config import PARSER_BACKEND
+
+# Lignes du tableau six_day exploitees par load_data_f.parse_forecast
+ROW_NAMES = ('days', 'time', 'rating', 'swell', 'wind', 'wind-state')
+
+# Taille des blocs passes au tokenizer
+CHUNK_SIZE = 16 * 1024
+
+
+class _RowsComplete(Exception):
+    """Levee par le tokenizer des que toutes les lignes recherchees sont lues."""
+
+
+class _ForecastRowParser(HTMLParser):
+    """
+    Tokenizer en flux qui ne collecte que les cellules des <tr data-row="...">.
+
+    Seules les cellules <td>/<th> enfants directs de la ligne sont retenues;
+    leur texte est reconstitue comme BeautifulSoup.get_text(strip=True)
+    (fragments nettoyes puis concatenes).
+    """
+
+    def __init__(self, row_names):
+        super().__init__(convert_charrefs=True)
+        self.wanted = set(row_names)
+        self.rows = {}
+        self._row = None        # Nom de la ligne en cours de lecture
+        self._cells = None      # Cellules de la ligne en cours
+        self._cell = None       # Fragments de texte de la cellule en cours
+        self._colspan = 1
+        self._table_depth = 0   # Tableaux imbriques dans la ligne courante
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr' and self._table_depth == 0:
+            self._end_row()
+            name = dict(attrs).get('data-row')
+            if name in self.wanted and name not in self.rows:
+                self._row = name
+                self._cells = []
+            return
+
+        if self._row is None:
+            return
+
+        if tag == 'table':
+            self._table_depth += 1
+        elif tag in ('td', 'th') and self._table_depth == 0:
+            # Cellule precedente non fermee explicitement (</td> optionnel)
+            self._end_cell()
+            self._cell = []
+            self._colspan = dict(attrs).get('colspan') or 1
+
+    def handle_endtag(self, tag):
+        if self._row is None:
+            return
+
+        if tag == 'table':
+            if self._table_depth == 0:
+                self._end_row()
+            else:
+                self._table_depth -= 1
+        elif self._table_depth > 0:
+            return
+        elif tag in ('td', 'th'):
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            text = data.strip()
+            if text:
+                self._cell.append(text)
+
+    def _end_cell(self):
+        if self._cell is not None:
+            self._cells.append((''.join(self._cell), self._colspan))
+        self._cell = None
+
+    def _end_row(self):
+        if self._row is None:
+            return
+        self._end_cell()
+        self.rows[self._row] = self._cells
+        self._row = None
+        self._cells = None
+        self._table_depth = 0
+        if len(self.rows) == len(self.wanted):
+            # Interrompt feed() sans tokeniser la fin du bloc courant
+            raise _RowsComplete()
+
+
+def extract_rows_fast(content: bytes, row_names=ROW_NAMES) -> dict:
+    """
+    Extrait les cellules des lignes data-row sans construire d'arbre DOM.
+
+    Le document n'est tokenise qu'a partir de la premiere ligne data-row
+    (le tableau de prevision est au milieu d'une page volumineuse) et la
+    lecture s'arrete des que toutes les lignes demandees ont ete vues.
+
+    Args:
+        content: HTML brut de la page
+        row_names: Noms des lignes data-row a extraire
+
+    Returns:
+        Dict {nom_ligne: [(texte, colspan), ...]}. Les lignes absentes de la
+        page ne figurent pas dans le dict.
+    """
+    start = content.find(b'data-row=')
+    if start < 0:
+        return {}
+    tr_start = content.rfind(b'<tr', 0, start)
+    if tr_start >= 0:
+        start = tr_start
+
+    text = content[start:].decode('utf-8', errors='replace')
+    parser = _ForecastRowParser(row_names)
+    try:
+        for offset in range(0, len(text), CHUNK_SIZE):
+            parser.feed(text[offset:offset + CHUNK_SIZE])
+        parser.close()
+        parser._end_row()
+    except _RowsComplete:
+        pass
+    return parser.rows
+
+
+def extract_rows_bs4(content: bytes, row_names=ROW_NAMES) -> dict:
+    """
+    Extrait les cellules des lignes data-row via un arbre BeautifulSoup complet.
+
+    Implementation de reference (et de repli) de extract_rows_fast.
+
+    Args:
+        content: HTML brut de la page
+        row_names: Noms des lignes data-row a extraire
+
+    Returns:
+        Dict {nom_ligne: [(texte, colspan), ...]} (lignes absentes omises)
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    rows = {}
+    for name in row_names:
+        row = soup.find('tr', {'data-row': name})
+        if row:
+            cells = row.find_all(['td', 'th'], recursive=False)
+            rows[name] = [(cell.get_text(strip=True), cell.get('colspan', 1)) for cell in cells]
+    return rows
+
+
+BACKENDS = {
+    'fast': extract_rows_fast,
+    'bs4': extract_rows_bs4,
+}
+
+
+def extract_rows(content: bytes, backend: str = PARSER_BACKEND,
+                 required=('days', 'time')) -> dict:
+    """
+    Extrait les lignes data-row avec le backend choisi, avec repli BeautifulSoup.
+
+    Si le backend rapide echoue ou ne trouve pas les lignes indispensables
+    (structure de page inattendue), l'extraction est refaite avec BeautifulSoup.
+
+    Args:
+        content: HTML brut de la page
+        backend: Nom du backend ('fast' ou 'bs4', cf. PARSER_BACKEND)
+        required: Lignes sans lesquelles le resultat est juge invalide
+
+    Returns:
+        Dict {nom_ligne: [(texte, colspan), ...]} (lignes absentes omises)
+    """
+    extract = BACKENDS.get(backend, extract_rows_bs4)
+    if extract is not extract_rows_bs4:
+        try:
+            rows = extract(content)
+            if all(name in rows for name in required):
+                return rows
+        except Exception as e:
+            print(f"Parseur '{backend}' en echec ({e}), repli sur BeautifulSoup")
+    return extract_rows_bs4(content)
@@ -0,0 +1,185 @@
+# Pipeline de chargement en flux: telechargement, parsing et assemblage relies par des files bornees
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import sys
+sys.path.append('..')
+from config import MAX_WORKERS, PARSE_WORKERS, PIPELINE_QUEUE_SIZE
+from webscrapping import load_data_f as scraper
+from metrics import run_metrics
+
+# Fin de flux dans les files du pipeline
+_END = object()
+
+# Intervalle de verification de l'arret du pipeline par les threads bloques (secondes)
+POLL_INTERVAL = 0.1
+
+
+class SpotPipeline:
+    """
+    Charge des spots en trois etages relies par des files bornees.
+
+        fetch   threads (E/S)        cache, requete HTTP, replis (load_data_f.fetch_page)
+          | file 'pages' (PIPELINE_QUEUE_SIZE pages brutes au plus)
+        parse   pool de processus    extraction des cellules (load_data_f.parse_page),
+                                     puis mise en cache (load_data_f.finish_page)
+          | file 'results' (PIPELINE_QUEUE_SIZE spots au plus)
+        stream  consommateur         cellules de chaque spot, dans l'ordre d'arrivee
+
+    Le parsing (CPU) d'une page chevauche ainsi l'attente reseau des
+    suivantes, hors du GIL des threads de telechargement. Quand un etage
+    aval prend du retard, les files pleines bloquent l'etage amont: le
+    nombre de pages en memoire reste borne quelle que soit la taille du run.
+    Les spots servis sans parsing (cache, 304, repli) passent directement
+    de l'etage fetch au consommateur.
+    """
+
+    def __init__(self, fetch_workers: int = MAX_WORKERS, parse_workers: int = PARSE_WORKERS,
+                 queue_size: int = PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            fetch_workers: Nombre de threads de telechargement
+            parse_workers: Nombre de processus de parsing (0 = parsing dans
+                           un thread du processus principal)
+            queue_size: Capacite des files entre etages
+        """
+        self.fetch_workers = max(1, fetch_workers or 1)
+        self.parse_workers = max(0, parse_workers or 0)
+        self.queue_size = max(1, queue_size)
+        self._stop = threading.Event()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Ajoute a une file bornee en attendant de la place (False si le pipeline s'arrete)."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Retire d'une file (_END si le pipeline s'arrete)."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fetch_worker(self, spots: queue.Queue, pages: queue.Queue, results: queue.Queue,
+                      refresh: set) -> None:
+        while True:
+            spot = self._get(spots)
+            if spot is _END:
+                return
+            event = scraper.fetch_event(spot)
+            try:
+                page = scraper.fetch_page(spot, event, refresh is None or spot in refresh)
+            except Exception as e:
+                run_metrics.record('fetch', **event)
+                self._put(results, (spot, e))
+                continue
+            if 'cells' in page:
+                run_metrics.record('fetch', **event)
+                self._put(results, (spot, page['cells']))
+            else:
+                self._put(pages, (spot, page, event))
+
+    def _parse_worker(self, pages: queue.Queue, results: queue.Queue, pool) -> None:
+        while True:
+            item = self._get(pages)
+            if item is _END:
+                return
+            spot, page, event = item
+            try:
+                if pool is None:
+                    cells, duration = scraper.parse_page(page['content'], spot)
+                else:
+                    cells, duration = pool.submit(scraper.parse_page, page['content'], spot).result()
+                run_metrics.record('parse', spot=spot, duration_s=duration,
+                                   rows=len(cells.get('day', ())))
+                result = scraper.finish_page(page, cells, event)
+            except Exception as e:
+                result = e
+            run_metrics.record('fetch', **event)
+            self._put(results, (spot, result))
+
+    def _start_pool(self):
+        """
+        Pool de parsing, processus demarres avant les threads du pipeline.
+
+        Les processus ne sont pas crees par fork: le processus principal a
+        deja des threads (secours de FetchPolicy, verrous du limiteur de
+        debit), dont un verrou herite pourrait bloquer un fils. Le parsing
+        n'echange que des octets et des cellules, serialisables.
+        """
+        if not self.parse_workers:
+            return None
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                   mp_context=multiprocessing.get_context(method))
+        for future in [pool.submit(os.getpid) for _ in range(self.parse_workers)]:
+            future.result()
+        return pool
+
+    def stream(self, spots: list, refresh: set = None):
+        """
+        Charge des spots et livre leurs cellules au fil de l'eau.
+
+        Args:
+            spots: Spots distincts a charger
+            refresh: Spots a re-telecharger si leur cache n'est plus frais
+                     (cf. load_data_f.load_cells; None = tous)
+
+        Yields:
+            Tuples (spot, cellules) dans l'ordre d'arrivee (cf. load_data_f.load_cells)
+
+        Raises:
+            Exception: Erreur inattendue d'un etage, relevee dans le consommateur
+        """
+        if not spots:
+            return
+        self._stop.clear()
+        pool = self._start_pool()
+
+        spot_queue = queue.Queue()
+        for spot in spots:
+            spot_queue.put(spot)
+        fetchers = min(self.fetch_workers, len(spots))
+        for _ in range(fetchers):
+            spot_queue.put(_END)
+        pages = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue(maxsize=self.queue_size)
+
+        parsers = max(1, self.parse_workers)
+        threads = [
+            threading.Thread(target=self._fetch_worker, args=(spot_queue, pages, results, refresh),
+                             name=f'pipeline-fetch-{i}', daemon=True)
+            for i in range(fetchers)
+        ] + [
+            threading.Thread(target=self._parse_worker, args=(pages, results, pool),
+                             name=f'pipeline-parse-{i}', daemon=True)
+            for i in range(parsers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for _ in range(len(spots)):
+                spot, cells = self._get(results)
+                if isinstance(cells, Exception):
+                    raise cells
+                yield spot, cells
+            # Tous les spots sont arrives: la file des pages est vide
+            for _ in range(parsers):
+                pages.put(_END)
+        finally:
+            # Arret (y compris si le consommateur abandonne le flux en cours de route)
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
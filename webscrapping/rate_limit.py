@@ -0,0 +1,48 @@
+# Limitation du debit de requetes par hote, partagee entre les threads de scraping
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """
+    Espace les requetes vers un meme hote d'au moins 1/rate secondes.
+
+    Thread-safe: chaque appel a wait() reserve sous verrou le prochain creneau
+    libre de l'hote, puis dort hors verrou jusqu'a ce creneau. Les hotes
+    differents ne se bloquent pas entre eux.
+    """
+
+    def __init__(self, rate: float = None):
+        """
+        Args:
+            rate: Nombre maximal de requetes par seconde et par hote
+                  (0 ou None: pas de limitation)
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        """
+        Bloque jusqu'a ce que l'hote de l'URL puisse etre interroge.
+
+        Args:
+            url: URL de la requete a emettre
+
+        Returns:
+            Temps d'attente effectif (en secondes)
+        """
+        if self.interval <= 0:
+            return 0.0
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
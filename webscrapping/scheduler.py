@@ -0,0 +1,131 @@
+# Planification des rafraichissements: quels spots re-telecharger a chaque run
+import json
+import math
+import os
+import time
+from pathlib import Path
+import sys
+sys.path.append('..')
+from config import REFRESH_BUDGET, SCHEDULER_STATE
+from webscrapping.schema import coerce_rating
+
+# Frequence de changement supposee d'un spot sans historique (changements par heure)
+DEFAULT_CHANGE_RATE = 1 / 3
+
+# Poids des nouvelles observations dans la moyenne glissante de la frequence de changement
+CHANGE_RATE_ALPHA = 0.3
+
+# Creneaux "proches" pris en compte pour la note d'un spot (2 jours x 3 creneaux)
+NEAR_TERM_SLOTS = 6
+
+
+class RefreshScheduler:
+    """
+    Choisit les spots a re-telecharger dans la limite d'un budget de requetes.
+
+    Pour chaque spot, l'etat conserve la date du dernier telechargement, une
+    estimation de sa frequence de changement (moyenne glissante des pages
+    modifiees par heure ecoulee) et la meilleure note de ses creneaux proches.
+    La priorite d'un spot est la probabilite que sa page ait change depuis le
+    dernier telechargement, ponderee par cette note:
+
+        priorite = (1 - exp(-frequence x age)) x (1 + note)
+
+    Un spot sans prevision en cache est toujours telecharge. Les spots non
+    retenus reutilisent leur derniere prevision (cf. load_data_f.load_cells).
+    """
+
+    def __init__(self, cache, path: str = SCHEDULER_STATE):
+        """
+        Args:
+            cache: ForecastCache du scraper (entrees et dates de telechargement)
+            path: Fichier d'etat JSON
+        """
+        self.cache = cache
+        self.path = Path(path)
+        self.state = self._load()
+        self._entries = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        """Ecrit l'etat du planificateur (ecriture atomique)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def priority(self, spot: str, now: float = None) -> float:
+        """
+        Priorite de rafraichissement d'un spot (infinie sans prevision en cache).
+
+        Args:
+            spot: Nom du spot
+            now: Instant de reference (secondes depuis l'epoch)
+
+        Returns:
+            Priorite (plus elevee = a re-telecharger en premier)
+        """
+        entry = self._entries.get(spot) or self.cache.lookup(spot)
+        if not entry:
+            return math.inf
+        now = time.time() if now is None else now
+        stats = self.state.get(spot, {})
+        age_hours = max(0.0, now - entry.get('fetched_at', 0)) / 3600
+        rate = stats.get('change_rate', DEFAULT_CHANGE_RATE)
+        return (1 - math.exp(-rate * age_hours)) * (1 + max(0, stats.get('near_rating', 0)))
+
+    def plan(self, spots: list, budget: int = REFRESH_BUDGET, now: float = None) -> set:
+        """
+        Choisit les spots a re-telecharger pour ce run.
+
+        Args:
+            spots: Spots du run
+            budget: Nombre maximal de spots re-telecharges (None = tous)
+            now: Instant de reference (secondes depuis l'epoch)
+
+        Returns:
+            Ensemble des spots a re-telecharger; les spots sans prevision en
+            cache en font toujours partie, meme au-dela du budget
+        """
+        self._entries = {spot: self.cache.lookup(spot) for spot in spots}
+        if budget is None:
+            return set(spots)
+        ranked = sorted(spots, key=lambda spot: self.priority(spot, now), reverse=True)
+        missing = {spot for spot in spots if not self._entries[spot]}
+        return missing | set(ranked[:max(0, budget)])
+
+    def observe(self, spot: str, cells: dict, now: float = None) -> None:
+        """
+        Met a jour l'etat d'un spot apres son chargement.
+
+        Args:
+            spot: Nom du spot
+            cells: Cellules servies pour le spot (cf. load_data_f.load_cells)
+            now: Instant de reference (secondes depuis l'epoch)
+        """
+        before = self._entries.get(spot)
+        after = self.cache.lookup(spot)
+        stats = self.state.setdefault(spot, {})
+
+        # Page re-telechargee (200 ou 304) depuis plan(): mise a jour de la frequence de changement
+        if after and (not before or after.get('fetched_at') != before.get('fetched_at')):
+            if before:
+                hours = max(1 / 60, (after['fetched_at'] - before['fetched_at']) / 3600)
+                changed = after['hash'] != before['hash']
+                rate = stats.get('change_rate', DEFAULT_CHANGE_RATE)
+                stats['change_rate'] = round(
+                    (1 - CHANGE_RATE_ALPHA) * rate + CHANGE_RATE_ALPHA * (changed / hours), 6
+                )
+            stats['last_fetch'] = after['fetched_at']
+
+        if cells and cells.get('rating'):
+            ratings = coerce_rating(cells['rating'][:NEAR_TERM_SLOTS])
+            stats['near_rating'] = int(ratings.max())
+        stats['last_seen'] = time.time() if now is None else now
@@ -0,0 +1,197 @@
+# Schema compact des previsions: categories et types numeriques etroits
+import numpy as np
+import pandas as pd
+import sys
+sys.path.append('..')
+from config import TIME_MAPPING, WIND_QUALITY
+
+# Valeurs connues des colonnes categorielles. Une valeur inattendue n'est pas
+# perdue: elle est ajoutee aux categories de la colonne (cf. _categorical).
+DIRECTIONS = ['', 'N', 'NNE', 'NE', 'ENE', 'E', 'ESE', 'SE', 'SSE',
+              'S', 'SSW', 'SW', 'WSW', 'W', 'WNW', 'NW', 'NNW']
+TIMES_OF_DAY = list(TIME_MAPPING)
+WIND_STATES = [''] + list(WIND_QUALITY)
+
+CATEGORIES = {
+    'spot': [],
+    'time': TIMES_OF_DAY,
+    'wave_dir': DIRECTIONS,
+    'wind_dir': DIRECTIONS,
+    'wind_state': WIND_STATES,
+}
+
+# Types numeriques des colonnes d'une prevision de spot
+NUMERIC_DTYPES = {
+    'rating': 'int8',
+    'wave_height': 'float32',
+    'period': 'uint8',
+    'wind_speed': 'uint8',
+}
+
+# Decimales conservees en repassant les hauteurs float32 en float64
+HEIGHT_DECIMALS = 2
+
+
+def _categorical(values, known: list) -> pd.Categorical:
+    """Categoriel avec les valeurs connues en tete, puis les valeurs inattendues (ordre d'arrivee)."""
+    index = {category: code for code, category in enumerate(known)}
+    codes = [
+        index.setdefault(value, len(index))
+        for value in ('' if value is None or value != value else str(value) for value in values)
+    ]
+    return pd.Categorical.from_codes(np.array(codes, dtype=np.int32), categories=list(index))
+
+
+def coerce_rating(values) -> np.ndarray:
+    """
+    Convertit des ratings bruts en int8.
+
+    '!' (saturation/indisponibilite) vaut -1, toute autre valeur illisible 0.
+
+    Args:
+        values: Ratings bruts (chaines du site) ou deja numeriques
+
+    Returns:
+        Tableau int8
+    """
+    array = np.asarray(values)
+    if array.dtype == 'int8':
+        return array
+    if array.dtype.kind not in 'biuf':
+        series = pd.Series(array, dtype=object).replace('!', -1)
+        array = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=0)
+    return np.nan_to_num(array.astype('float64')).astype('int8')
+
+
+def _numeric(values, dtype: str) -> np.ndarray:
+    """Valeurs numeriques du type demande; illisibles a 0, entiers bornes a la capacite du type."""
+    array = np.asarray(values)
+    if array.dtype == dtype:
+        return array
+    if array.dtype.kind not in 'biuf':
+        array = pd.to_numeric(pd.Series(array, dtype=object), errors='coerce').to_numpy(dtype='float64', na_value=0)
+    array = np.nan_to_num(array.astype('float64'))
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        info = np.iinfo(dtype)
+        array = np.clip(array, info.min, info.max)
+    return array.astype(dtype)
+
+
+def has_schema(frame: pd.DataFrame) -> bool:
+    """Indique si toutes les colonnes du schema presentes ont deja leur type compact."""
+    for col in frame.columns:
+        dtype = frame[col].dtype
+        if col in CATEGORIES and not isinstance(dtype, pd.CategoricalDtype):
+            return False
+        if col in NUMERIC_DTYPES and dtype != NUMERIC_DTYPES[col]:
+            return False
+    return True
+
+
+def apply_schema(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applique le schema compact a une prevision de spot.
+
+    Colonnes categorielles: spot, time, wave_dir, wind_dir, wind_state;
+    rating en int8, wave_height en float32, period et wind_speed en uint8.
+    Idempotent: une prevision deja typee est retournee telle quelle.
+
+    Args:
+        frame: Prevision d'un ou plusieurs spots (cf. load_data_f.COLUMNS)
+
+    Returns:
+        DataFrame aux types compacts (memes colonnes, meme ordre)
+    """
+    if has_schema(frame):
+        return frame
+    return pd.DataFrame(schema_columns({col: frame[col] for col in frame.columns}), index=frame.index)
+
+
+def schema_columns(columns: dict) -> dict:
+    """
+    Convertit des colonnes brutes (listes, tableaux ou Series) au schema compact.
+
+    Permet de construire directement un DataFrame type, sans passer par un
+    DataFrame intermediaire aux types generiques (cf. load_data_f.parse_forecast).
+
+    Args:
+        columns: Dict {colonne: valeurs} de meme longueur
+
+    Returns:
+        Dict {colonne: valeurs typees}, dans le meme ordre
+    """
+    typed = {}
+    for col, values in columns.items():
+        if col in CATEGORIES:
+            if not isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+                values = _categorical(values, CATEGORIES[col])
+            typed[col] = values
+        elif col in NUMERIC_DTYPES:
+            values = np.asarray(values) if not isinstance(values, pd.Series) else values.to_numpy()
+            typed[col] = coerce_rating(values) if col == 'rating' else _numeric(values, NUMERIC_DTYPES[col])
+        else:
+            typed[col] = values
+    return typed
+
+
+def concat_frames(frames: list) -> pd.DataFrame:
+    """
+    Concatene des previsions en conservant le schema compact.
+
+    pd.concat conserve une colonne categorielle quand toutes les categories
+    sont identiques (time, directions...), sinon retombe en chaines (spot):
+    le schema est reapplique une seule fois sur le resultat, plutot que
+    d'aligner les categories DataFrame par DataFrame.
+
+    Args:
+        frames: DataFrames de previsions (cf. apply_schema)
+
+    Returns:
+        DataFrame concatene (index reinitialise)
+    """
+    if not frames:
+        return pd.DataFrame()
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def map_categories(series: pd.Series, func, missing=None, dtype=object) -> np.ndarray:
+    """
+    Applique une fonction une fois par categorie puis la diffuse via les codes.
+
+    Fonctionne aussi sur une serie non categorielle (une fois par valeur distincte).
+
+    Args:
+        series: Colonne (categorielle ou non)
+        func: Fonction appliquee a chaque valeur distincte
+        missing: Resultat pour les valeurs manquantes
+        dtype: Type du tableau resultat
+
+    Returns:
+        Tableau numpy aligne sur series
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    mapped = np.array([func(category) for category in series.cat.categories], dtype=dtype)
+    codes = series.cat.codes.to_numpy()
+    if len(mapped) == 0:
+        return np.full(len(codes), missing, dtype=dtype)
+    result = mapped[codes]
+    if (codes < 0).any():
+        result[codes < 0] = missing
+    return result
+
+
+def heights_as_float64(values) -> pd.Series:
+    """
+    Hauteurs en float64, sans le bruit de representation du float32.
+
+    float(np.float32(1.2)) vaut 1.2000000476837158: on arrondit a
+    HEIGHT_DECIMALS decimales pour retrouver 1.2 a l'affichage.
+
+    Args:
+        values: Hauteurs (float32, float64 ou chaines)
+
+    Returns:
+        Serie float64
+    """
+    return pd.to_numeric(pd.Series(values), errors='coerce').astype('float64').round(HEIGHT_DECIMALS)
@@ -0,0 +1,45 @@
+# Session HTTP partagee (connexions persistantes, compression)
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+import sys
+sys.path.append('..')
+from config import MAX_WORKERS
+
+# Brotli n'est decode par urllib3 que si le module est installe: on ne
+# l'annonce au serveur que dans ce cas.
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Retourne la session HTTP partagee par tous les threads de scraping.
+
+    La session garde les connexions TLS ouvertes (keep-alive) et son pool est
+    dimensionne sur MAX_WORKERS pour que chaque thread reutilise une connexion.
+
+    Returns:
+        Instance unique de requests.Session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(MAX_WORKERS, 1))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Accept-Encoding': ACCEPT_ENCODING})
+                _session = session
+    return _session